@@ -1,30 +1,56 @@
 from argparse import Namespace
 import datetime
+import time
 from decimal import Decimal, ROUND_UP
-from typing import Tuple, List
+import os
+from typing import Callable, Iterator, Tuple, List, Union
 
 from dimka.core.config import Config
+from dimka.core.journal import StateJournal
+from dimka.core.market import MarketData, MarketDataReader
+from dimka.core.resilience import Resilience, public_read, private_read, trade_call
+from dimka.core.tracing import Tracer, TracedLogger, traced, DB
+from dimka.bot.exchange import LiveExchange
+from dimka.bot.raw import TradeRecord, DepthLevel
 import dimka.core.utils as utils
 import dimka.core.models as bot_models
 from wexapi.keyhandler import KeyHandler
-from wexapi.common import WexConnection
-from wexapi.trade import TradeApi
-from wexapi.public import InfoApi, PublicApi
 
 import wexapi.models as models
 
+# Max seconds local clock is ahead of the exchange clock (order timestamps)
+RECONCILE_CLOCK_SKEW = 60
+
 
 class BaseBot(object):
-    def __init__(self, key: str, key_handler: KeyHandler, config: Config, args: Namespace):
+    def __init__(
+            self,
+            key: str,
+            key_handler: KeyHandler,
+            config: Config,
+            args: Namespace,
+            exchange: LiveExchange = None,
+    ):
+        """
+        :param exchange: execution backend (default - real orders on the exchange)
+        """
         self.key = key
         self.key_handler = key_handler
         self.params = config.params
         self.pair = config.params.get("pair")
         self.logger = config.log
         self.args = args
-        self.pair_info = InfoApi(WexConnection()).get_pair_info(
-            config.params.get("pair")
-        )
+        self.journal = StateJournal(config.params.get("journal_path"))
+        self.market = None
+        self.resilience = Resilience(config.params)
+        self.tracer = config.tracer or Tracer()
+        if self.tracer.enabled:
+            self.logger = TracedLogger(self.logger, self.tracer)
+        self.exchange = exchange or LiveExchange(key, key_handler, timeout=self.resilience.timeout)
+        # latest order and trade ids seen by the bot (exchange ids are ascending)
+        self.last_order_id = 0
+        self.last_trade_id = 0
+        self.pair_info = self.exchange.pair_info(config.params.get("pair"))
 
     def run(self):
         raise NotImplementedError(
@@ -41,6 +67,8 @@ class BaseBot(object):
 
         return base, quote
 
+    @traced("funds")
+    @private_read("getInfo")
     def funds(self) -> Tuple[Decimal, Decimal]:
         """
         Get account funds according to trading pair:
@@ -49,33 +77,30 @@ class BaseBot(object):
         Returns:
             Tuple[Decimal, Decimal]: first - is base coin funds, second - quote coin funds
         """
-        with WexConnection() as conn:
-            t = TradeApi(self.key, self.key_handler, conn)
-            r = t.get_info()
-
-            base, quote = self.split_pair()
+        funds = self.exchange.funds()
+        base, quote = self.split_pair()
 
-            return r.funds[base], r.funds[quote]
+        return funds[base], funds[quote]
 
+    @traced("active_orders")
+    @private_read("ActiveOrders")
     def active_orders(self, orders_type: str = None) -> List[models.Order]:
         """
         Get active orders list.
         If defined type (buy, sell) return orders with this type
         """
-        with WexConnection() as conn:
-            t = TradeApi(self.key, self.key_handler, conn)
+        orders = self.exchange.active_orders(self.pair)
+        self.seen_ids(order.order_id for order in orders)
 
-            orders = t.active_orders(self.pair)
+        if orders_type is not None:
+            result = []
+            for order in orders:
+                if order.type == orders_type:
+                    result.append(order)
 
-            if orders_type is not None:
-                result = []
-                for order in orders:
-                    if order.type == orders_type:
-                        result.append(order)
+            return result
 
-                return result
-
-            return orders
+        return orders
 
     def units(self) -> int:
         """ Pair currencies decimal units """
@@ -87,61 +112,210 @@ class BaseBot(object):
 
         if len(buy_orders) > 0:
 
-            self.logger.warning("Cancel all opened BUY orders: {}".format(len(buy_orders)))
+            self.logger.warning("Cancel all opened BUY orders: %s", len(buy_orders))
+
+            for order in buy_orders:
+                result = self.cancel_order(order.order_id)
+                self.logger.debug("  Canceled order #%s", result.order_id)
+
+    def market_data(self) -> Union[None, MarketData]:
+        """
+        Fresh pair market data from the shared memory (supervisor market data feeder).
+        None if bot is running without feeder or data is stale.
+        """
+        path = getattr(self.args, "market_data", None)
+        if not path:
+            return None
 
-            with WexConnection() as conn:
-                t = TradeApi(self.key, self.key_handler, conn)
+        if self.market is None:
+            if not os.path.isfile(path):
+                return None
+            self.market = MarketDataReader(path)
 
-                for order in buy_orders:
-                    result = t.cancel_order(order.order_id)
-                    self.logger.debug("  Canceled order #{}".format(result.order_id))
+        return self.market.fresh(self.pair, self.params.get("market_data_max_age", 10))
 
+    @traced("history_records")
+    @private_read("TradeHistory")
+    def history_records(self, count: int = 100) -> Iterator[TradeRecord]:
+        """
+        Trade history (latest first) as compact records.
+        Decimal fields are converted only when accessed.
+        """
+        return self.seen_records(self.exchange.trade_history(self.pair, count))
+
+    def seen_ids(self, order_ids: Iterator[int], trade_ids: Iterator[int] = ()):
+        """ Remember latest order and trade ids seen by the bot """
+        self.last_order_id = max(self.last_order_id, max(order_ids, default=0))
+        self.last_trade_id = max(self.last_trade_id, max(trade_ids, default=0))
+
+    def seen_records(self, records: Iterator[TradeRecord]) -> Iterator[TradeRecord]:
+        """ Trade history records, their ids are remembered when read """
+        for item in records:
+            self.seen_ids((item.order_id,), (item.trade_id,))
+            yield item
+
+    def find_history_item(self, predicate: Callable[[TradeRecord], bool], count: int = 100) -> Union[None, TradeRecord]:
+        """ First (latest) trade history item matching predicate """
+        for item in self.history_records(count):
+            if predicate(item):
+                return item
+
+        return None
+
+    @traced("depth")
+    @public_read("depth")
+    def depth(self, limit: int = 150) -> Tuple[List[DepthLevel], List[DepthLevel]]:
+        """
+        Pair depth as compact records.
+        Decimal fields are converted only when accessed.
+
+        :return: asks, bids
+        """
+        return self.exchange.depth(self.pair, limit)
+
+    @traced("top_sell_price", category=None)
     def top_sell_price(self) -> Decimal:
         """ Top sell price - top price from sell queue """
-        with WexConnection() as conn:
-            asks, _ = PublicApi(conn).get_depth(self.pair, limit=1)
+        data = self.market_data()
+        if data is not None and data.ask_price is not None:
+            return data.ask_price
+
+        asks, _ = self.depth(limit=1)
 
-            return asks[0][0]
+        return asks[0].price
 
+    @traced("top_buy_price", category=None)
     def top_buy_price(self) -> Decimal:
         """ Top buy price - top price from buy queue """
-        with WexConnection() as conn:
-            _, bids = PublicApi(conn).get_depth(self.pair, limit=1)
+        data = self.market_data()
+        if data is not None and data.bid_price is not None:
+            return data.bid_price
+
+        _, bids = self.depth(limit=1)
 
-            return bids[0][0]
+        return bids[0].price
+
+    def sleep(self, seconds: float):
+        """ Sleep (traced) """
+        self.tracer.sleep(seconds)
 
     def get_price_unit(self) -> Decimal:
         """ Get minimum price unit for current pair  """
         return utils.td(utils.quanta[-1], self.pair_info.decimal_places, ROUND_UP)
 
+    @traced("create_buy_order")
+    @trade_call("Trade", reconcile="reconcile_buy_order", snapshot="trade_snapshot")
     def create_buy_order(self, buy_price: Decimal, buy_amount: Decimal) -> models.TradeResult:
         """ Create buy order """
-        with WexConnection() as conn:
-            t = TradeApi(self.key, self.key_handler, conn)
-
-            return t.trade(self.pair, 'buy', buy_price, buy_amount)
+        return self.exchange.trade(self.pair, 'buy', buy_price, buy_amount)
 
+    @traced("create_sell_order")
+    @trade_call("Trade", reconcile="reconcile_sell_order", snapshot="trade_snapshot")
     def create_sell_order(self, sell_price: Decimal, sell_amount: Decimal) -> models.TradeResult:
-        """ Create buy order """
-        with WexConnection() as conn:
-            t = TradeApi(self.key, self.key_handler, conn)
-
-            return t.trade(self.pair, 'sell', sell_price, sell_amount)
+        """ Create sell order """
+        return self.exchange.trade(self.pair, 'sell', sell_price, sell_amount)
 
+    @traced("cancel_order")
+    @trade_call("CancelOrder", reconcile="reconcile_cancel_order")
     def cancel_order(self, order_id: int) -> models.CancelOrderResult:
         """ Cancel order """
-        with WexConnection() as conn:
-            t = TradeApi(self.key, self.key_handler, conn)
+        return self.exchange.cancel_order(order_id)
+
+    @traced("order_info")
+    @private_read("OrderInfo")
+    def order_info(self, order_id: int) -> models.OrderInfo:
+        """ Get order info """
+        order = self.exchange.order_info(order_id)
+        self.seen_ids((order.order_id,))
+
+        return order
+
+    def trade_snapshot(self, price: Decimal, amount: Decimal) -> dict:
+        """
+        Orders and trades known before the trade call (local state, no exchange requests),
+        they are ignored by reconcile_order
+
+        :return: dict(since: call start time, order_id: latest seen order id, trade_id: latest seen trade id)
+        """
+        return {
+            "since": time.time(),
+            "order_id": self.last_order_id,
+            "trade_id": self.last_trade_id,
+        }
+
+    def reconcile_buy_order(self, known: dict, buy_price: Decimal, buy_amount: Decimal) -> Union[None, models.TradeResult]:
+        """ Find BUY order placed by failed create_buy_order call """
+        return self.reconcile_order('buy', buy_price, known)
+
+    def reconcile_sell_order(self, known: dict, sell_price: Decimal, sell_amount: Decimal) -> Union[None, models.TradeResult]:
+        """ Find SELL order placed by failed create_sell_order call """
+        return self.reconcile_order('sell', sell_price, known)
 
-            return t.cancel_order(order_id)
+    def reconcile_order(self, order_type: str, price: Decimal, known: dict) -> Union[None, models.TradeResult]:
+        """
+        Find order placed by failed trade call (request can fail after the exchange received it).
+        New order with the same type and price is looked for in active orders (placed)
+        and trade history (executed), exchange is requested only here (after the failure).
+        Orders and trades seen before the call (previous cycles orders with the same price)
+        and older than the call are ignored.
+
+        :param known: trade_snapshot result
+        :return: trade result or None if order was not placed
+        """
+        rate = utils.td(price, self.pair_info.decimal_places)
+        # exchange timestamps, local clock can be ahead of the exchange
+        since = known["since"] - RECONCILE_CLOCK_SKEW
+
+        for order in self.active_orders(order_type):
+            if (
+                order.order_id > known["order_id"]
+                and order.timestamp_created >= since
+                and utils.td(order.rate, self.pair_info.decimal_places) == rate
+            ):
+                return models.TradeResult(0, order.amount, order.order_id, {})
+
+        item = self.find_history_item(
+            lambda record: (
+                record.is_your_order
+                and record.trade_id > known["trade_id"]
+                and record.order_id > known["order_id"]
+                and record.type == order_type
+                and record.timestamp >= since
+                and utils.td(record.rate, self.pair_info.decimal_places) == rate
+            ),
+            count=10,
+        )
+        if item is not None:
+            # order_id 0 - order was completely satisfied with the counter orders
+            return models.TradeResult(item.amount, 0, 0, {})
+
+        return None
+
+    def reconcile_cancel_order(self, order_id: int) -> Union[None, models.CancelOrderResult]:
+        """ Check is order canceled (or executed) by failed cancel_order call """
+        if self.order_info(order_id).status != 0:
+            return models.CancelOrderResult(order_id, {})
 
+        return None
+
+    @traced("journal_write", category=DB)
+    def journal_write(self, phase: str, **state):
+        """ Write bot state to the journal (fsync) """
+        self.journal.write(phase=phase, **state)
+
+    @traced("journal_clear", category=DB)
+    def journal_clear(self):
+        """ Clear the journal (fsync) """
+        self.journal.clear()
+
+    @traced("save_order", category=DB)
     def save_order(
             self,
             order: models.Order,
             parent_order: bot_models.OrderInfo = None,
     ) -> bot_models.OrderInfo:
         """ Save executed order to database """
-        self.logger.debug("Save order #{} to database".format(order.order_id))
+        self.logger.debug("Save order #%s to database", order.order_id)
         # if we here - order executed and we can save it to the DB
         order_info = bot_models.OrderInfo()
         order_info.pair = order.pair
@@ -158,12 +332,23 @@ class BaseBot(object):
 
         return order_info
 
+    @traced("ticker")
+    @public_read("ticker")
+    def ticker(self) -> models.Ticker:
+        """ Pair ticker """
+        return self.exchange.ticker(self.pair)
+
+    @traced("low_high_daily_prices", category=None)
     def low_high_daily_prices(self) -> Tuple[Decimal, Decimal]:
         """
         Get low and high daily prices
 
         :return: tuple low, high
         """
-        ticker = PublicApi(WexConnection()).get_ticker(self.pair)
+        data = self.market_data()
+        if data is not None:
+            return data.low, data.high
+
+        ticker = self.ticker()
 
         return ticker.low, ticker.high
@@ -0,0 +1,83 @@
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from wexapi.common import WexConnection
+from wexapi.keyhandler import KeyHandler
+from wexapi.public import InfoApi, PublicApi
+from wexapi.trade import TradeApi
+import wexapi.models as models
+
+from dimka.bot.raw import RawConnection, RawTradeApi, TradeRecord, DepthLevel, depth_levels
+
+
+class LiveExchange(object):
+    """
+    Wex.nz exchange execution backend (real orders).
+
+    Trade API clients (and their connections) are created on the first call and reused,
+    client is recreated after any error.
+    Requests timeout (seconds) is returned by `timeout` callable before each call.
+    """
+
+    def __init__(self, key: str = None, key_handler: KeyHandler = None, timeout: Callable[[], float] = None):
+        self.key = key
+        self.key_handler = key_handler
+        self.timeout = timeout or (lambda: 30)
+        self._trade_api = None
+        self._raw_trade_api = None
+
+    def pair_info(self, pair: str) -> models.PairInfo:
+        return InfoApi(WexConnection(self.timeout())).get_pair_info(pair)
+
+    def funds(self) -> Dict[str, Decimal]:
+        return self._trade(lambda t: t.get_info().funds)
+
+    def active_orders(self, pair: str) -> List[models.Order]:
+        return self._trade(lambda t: t.active_orders(pair))
+
+    def trade(self, pair: str, trade_type: str, rate: Decimal, amount: Decimal) -> models.TradeResult:
+        return self._trade(lambda t: t.trade(pair, trade_type, rate, amount))
+
+    def cancel_order(self, order_id: int) -> models.CancelOrderResult:
+        return self._trade(lambda t: t.cancel_order(order_id))
+
+    def order_info(self, order_id: int) -> models.OrderInfo:
+        return self._trade(lambda t: t.order_info(order_id))
+
+    def trade_history(self, pair: str, count: int) -> Iterator[TradeRecord]:
+        try:
+            if self._raw_trade_api is None:
+                self._raw_trade_api = RawTradeApi(self.key, self.key_handler, RawConnection(self.timeout()))
+            self._set_timeout(self._raw_trade_api.connection)
+
+            return self._raw_trade_api.trade_history_records(count_number=count, pair=pair)
+        except Exception:
+            self._raw_trade_api = None
+            raise
+
+    def depth(self, pair: str, limit: int) -> Tuple[List[DepthLevel], List[DepthLevel]]:
+        # new connection for each call: public reads can be sent in parallel (hedged)
+        with RawConnection(self.timeout()) as conn:
+            return depth_levels(conn, pair, limit)
+
+    def ticker(self, pair: str) -> models.Ticker:
+        with WexConnection(self.timeout()) as conn:
+            return PublicApi(conn).get_ticker(pair)
+
+    def _trade(self, call):
+        try:
+            if self._trade_api is None:
+                self._trade_api = TradeApi(self.key, self.key_handler, WexConnection(self.timeout()))
+            self._set_timeout(self._trade_api.connection)
+
+            return call(self._trade_api)
+        except Exception:
+            self._trade_api = None
+            raise
+
+    def _set_timeout(self, connection: WexConnection):
+        """ Apply current timeout to the reused connection (and its opened socket) """
+        timeout = self.timeout()
+        connection.conn.timeout = timeout
+        if connection.conn.sock is not None:
+            connection.conn.sock.settimeout(timeout)
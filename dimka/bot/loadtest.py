@@ -0,0 +1,503 @@
+import collections
+import copy
+import math
+import os
+import random
+import resource
+import threading
+import time
+from argparse import Namespace
+from decimal import Decimal
+from typing import Dict, List
+
+import wexapi.models as models
+
+import dimka.core.models as bot_models
+from dimka.bot import paper
+from dimka.bot.raw import DepthLevel
+from dimka.core.app import ArgumentParser, RestartBotException
+from dimka.core.config import Config
+from dimka.core.resilience import LatencyTracker
+from dimka.core.tracing import Tracer, summarize, NETWORK, DB, SLEEP, LOG
+
+# Pause between bot cycles (seconds, same as Application.run_bot)
+CYCLE_PAUSE = 15
+# Pause after the failed cycle (seconds, same as Application.run_bot)
+ERROR_PAUSE = 5
+
+# Step is degraded when cycle p95 latency grows by this factor against the first step
+DEGRADATION = 2.0
+# Process CPU usage (cores) when Python code is saturated: threads share one core (GIL)
+CPU_SATURATION = 0.9
+# Cycle phase is the bottleneck when its time per cycle grows more than this (seconds)
+PHASE_GROWTH = 0.005
+
+BOTTLENECKS = {
+    NETWORK: "exchange calls",
+    DB: "SQLite",
+    SLEEP: "thread scheduling (GIL)",
+    LOG: "logging",
+    "other": "CPU / GIL",
+}
+
+
+class SyntheticMarket(object):
+    """
+    Public API double: depth and ticker of the price oscillating around `price`
+    (sine wave with `period` seconds and noise), so bot orders are filled in both directions.
+    """
+
+    def __init__(
+            self,
+            price: Decimal = Decimal("1"),
+            amplitude: float = 0.05,
+            period: float = 60,
+            levels: int = 20,
+            decimal_places: int = 3,
+    ):
+        self.price = price
+        self.amplitude = amplitude
+        self.period = period
+        self.levels = levels
+        self.decimal_places = decimal_places
+        self.started = time.monotonic()
+
+    def pair_info(self, pair: str) -> models.PairInfo:
+        return models.PairInfo(self.decimal_places, Decimal("0.001"), Decimal("100000"), Decimal("0.01"), 0, Decimal("0.2"))
+
+    def current_price(self) -> Decimal:
+        phase = 2 * math.pi * (time.monotonic() - self.started) / self.period
+        factor = 1 + self.amplitude * math.sin(phase) + random.uniform(-0.001, 0.001)
+
+        return (self.price * Decimal(str(factor))).quantize(Decimal(1).scaleb(-self.decimal_places))
+
+    def depth(self, pair: str, limit: int):
+        price = self.current_price()
+        unit = Decimal(1).scaleb(-self.decimal_places)
+        tick = max(unit, (price / 1000).quantize(unit))
+        levels = min(limit or self.levels, self.levels)
+
+        asks = [DepthLevel(price + tick * (i + 1), Decimal("10")) for i in range(levels)]
+        bids = [DepthLevel(price - tick * i, Decimal("10")) for i in range(levels)]
+
+        return asks, bids
+
+    def ticker(self, pair: str) -> models.Ticker:
+        price = self.current_price()
+        high = self.price * Decimal(str(1 + self.amplitude))
+        low = self.price * Decimal(str(1 - self.amplitude))
+
+        return models.Ticker(high, low, self.price, 0, 0, price, price, price, int(time.time()))
+
+
+class LatencyExchange(object):
+    """
+    Exchange double: calls the wrapped exchange after the simulated network round trip.
+    Network is not modelled: no sockets are opened, so connections count,
+    file descriptors and socket buffers of the real accounts are not measured.
+    """
+
+    def __init__(self, exchange, latency: float = 0.02):
+        self.exchange = exchange
+        self.latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self.exchange, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            if self.latency:
+                time.sleep(random.expovariate(1 / self.latency))
+
+            return attr(*args, **kwargs)
+
+        return call
+
+
+class LoadTracer(Tracer):
+    """
+    Tracer which keeps traces in memory (instead of the trace file)
+    and scales bot sleeps by `time_scale`.
+    """
+
+    def __init__(self, time_scale: float = 1.0):
+        super().__init__(path=":memory:")
+        self.time_scale = time_scale
+        self.lock = threading.Lock()
+        self.traces = []
+
+    def sleep(self, seconds: float):
+        super().sleep(seconds * self.time_scale)
+
+    def export(self, spans):
+        trace = [{
+            "name": span.name,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "start": span.start / 1e9,
+            "end": span.end / 1e9,
+            "attributes": dict(span.attributes),
+        } for span in spans]
+
+        with self.lock:
+            self.traces.append(trace)
+
+    def collect(self) -> List[List[dict]]:
+        """ Traces exported since the previous call """
+        with self.lock:
+            traces, self.traces = self.traces, []
+
+        return traces
+
+
+class SchedulerProbe(threading.Thread):
+    """
+    Thread wake-up delay probe: overshoot of the short sleep grows
+    when threads are waiting for the GIL (or CPU).
+    """
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(name="scheduler-probe", daemon=True)
+        self.interval = interval
+        self.delays = LatencyTracker(size=10000)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            started = time.perf_counter()
+            time.sleep(self.interval)
+            self.delays.add(time.perf_counter() - started - self.interval)
+
+    def collect(self) -> float:
+        """ p95 wake-up delay since the previous call (seconds) """
+        delay = self.delays.percentile(95) or 0.0
+        self.delays = LatencyTracker(size=10000)
+
+        return delay
+
+
+class LoadTest(object):
+    """
+    Load test: simulated accounts run the bot against the in-process exchange double
+    (PaperExchange on the synthetic market, with simulated network latency) in one process,
+    one thread per account, as paper trading runs the grid variants.
+    All accounts use one SQLite database file.
+
+    Modelled is the multi-account process: Application.run trades only the first key account
+    (one process per account), so the live deployment doesn't run accounts this way.
+
+    Accounts count is ramped by steps, each step is measured for `duration` seconds:
+    cycles latency percentiles, throughput, time per cycle phase, process CPU and memory,
+    thread wake-up delay and errors (database locks).
+
+    Bot sleeps (waiting for orders, pauses between cycles) are scaled by `time_scale`,
+    network latency is not.
+    """
+
+    def __init__(
+            self,
+            config: Config,
+            bot_name: str,
+            db_path: str,
+            duration: float = 30,
+            warmup: float = 5,
+            time_scale: float = 0.01,
+            latency: float = 0.02,
+            market: SyntheticMarket = None,
+    ):
+        self.config = config
+        self.bot_name = bot_name
+        self.db_path = db_path
+        self.duration = duration
+        self.warmup = warmup
+        self.time_scale = time_scale
+        self.latency = latency
+        self.market = market or SyntheticMarket(period=max(1.0, 6000 * time_scale))
+
+        self.tracer = LoadTracer(time_scale)
+        self.probe = SchedulerProbe()
+        self.stopped = threading.Event()
+        self.threads = []
+        self.errors = collections.Counter()
+        self.errors_lock = threading.Lock()
+
+    def run(self, steps: List[int]) -> List[dict]:
+        """
+        Run load test
+
+        :param steps: accounts count of each step (ascending)
+        :return: steps results
+        """
+        self.init_db()
+
+        self.config.tracer = self.tracer
+        self.config.params = dict(self.config.params, journal_path=None, bot_name=self.bot_name)
+
+        feed = paper.MarketFeed(self.market, ttl=0.1)
+        base, quote = self.config.params.get("pair").split("_")
+        funds = self.config.params.get("paper_funds") or {base: 0, quote: 1000}
+
+        name = "dimka.bot.{}.bot".format(self.bot_name.lower())
+        module = __import__(name, fromlist=[''])
+        bot_class = getattr(module, "Bot")
+        args = self.bot_args(module)
+
+        self.probe.start()
+        results = []
+        try:
+            for accounts in steps:
+                rss = process_stats()["rss"]
+                added = accounts - len(self.threads)
+
+                while len(self.threads) < accounts:
+                    exchange = LatencyExchange(paper.PaperExchange(feed, funds), self.latency)
+                    bot = bot_class(None, None, self.config, copy.copy(args), exchange)
+
+                    thread = threading.Thread(
+                        target=self.run_account,
+                        args=(bot,),
+                        name="account-{}".format(len(self.threads) + 1),
+                        daemon=True,
+                    )
+                    thread.start()
+                    self.threads.append(thread)
+
+                result = self.measure(accounts)
+                result["rss_account"] = (result["rss"] - rss) / added if added > 0 else 0
+                results.append(result)
+
+                if self.config.log is not None:
+                    self.config.log.notice(
+                        "Load test: %s accounts, %.1f cycles/s, cycle p95 %.3fs",
+                        accounts,
+                        result["throughput"],
+                        result["cycle"]["p95"],
+                    )
+        finally:
+            self.stop()
+
+        return results
+
+    def bot_args(self, module) -> Namespace:
+        """ Bot arguments: defaults with config "args" section (converted by the bot arguments parser) """
+        parser = ArgumentParser()
+        module.add_arguments(parser)
+        args, _ = parser.parse_config_args([], self.config.params.get("args") or {}, self.config.log)
+        # no market data feeder in the load test
+        args.market_data = None
+
+        return args
+
+    def measure(self, accounts: int) -> dict:
+        """ Measure the step (after warmup) """
+        time.sleep(self.warmup)
+        self.tracer.collect()
+        self.probe.collect()
+        with self.errors_lock:
+            self.errors.clear()
+
+        started = time.monotonic()
+        cpu = time.process_time()
+        time.sleep(self.duration)
+        cpu = time.process_time() - cpu
+        elapsed = time.monotonic() - started
+
+        summary = summarize(self.tracer.collect())
+        cycles = summary["cycles"]["count"]
+        with self.errors_lock:
+            errors = dict(self.errors)
+
+        return dict(
+            process_stats(),
+            accounts=accounts,
+            cycles=cycles,
+            throughput=cycles / elapsed,
+            cycle=summary["cycles"],
+            phases={name: seconds / cycles if cycles else 0.0 for name, (seconds, _) in summary["phases"].items()},
+            db=summary["spans"].get("save_order", {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}),
+            wake_p95=self.probe.collect(),
+            cpu=cpu / elapsed,
+            errors=errors,
+        )
+
+    def run_account(self, bot):
+        """ Account thread: bot cycles loop (as Application.run_bot) """
+        try:
+            while not self.stopped.is_set():
+                pause = CYCLE_PAUSE
+                try:
+                    with self.tracer.span("cycle", bot=self.bot_name, pair=bot.pair):
+                        bot.run()
+                except RestartBotException as e:
+                    pause = e.timeout
+                except Exception as e:
+                    pause = ERROR_PAUSE
+                    with self.errors_lock:
+                        self.errors["{}: {}".format(type(e).__name__, e)[:80]] += 1
+
+                self.stopped.wait(pause * self.time_scale)
+        finally:
+            # connection of this thread
+            bot_models.database.close()
+
+    def init_db(self):
+        """ Create new database file """
+        if os.path.isfile(self.db_path):
+            os.remove(self.db_path)
+
+        if not bot_models.database.is_closed():
+            bot_models.database.close()
+
+        bot_models.database.init(self.db_path)
+        bot_models.database.create_tables([
+            bot_models.OrderInfo,
+            bot_models.Ticker,
+        ])
+        bot_models.database.close()
+
+    def stop(self, timeout: float = 10):
+        self.stopped.set()
+        self.probe.stopped.set()
+
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+        self.probe.join(timeout)
+
+
+def process_stats() -> Dict[str, int]:
+    """ Process resident memory (bytes), open file descriptors (sockets included) and threads """
+    try:
+        with open("/proc/self/statm", "r") as stream:
+            rss = int(stream.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # peak memory (kilobytes on linux)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    try:
+        fds = len(os.listdir("/proc/self/fd"))
+    except OSError:
+        fds = 0
+
+    return {"rss": rss, "fds": fds, "threads": threading.active_count()}
+
+
+def capacity(results: List[dict]) -> dict:
+    """
+    Scaling analysis
+
+    :return: dict(
+        capacity: max accounts count before degradation,
+        degraded: first degraded step accounts count (None - not degraded),
+        bottleneck: saturated resource on the degraded (or last) step
+    )
+    """
+    if not results:
+        return {"capacity": None, "degraded": None, "bottleneck": None}
+
+    base = results[0]
+    capacity_accounts = base["accounts"]
+    degraded = None
+    for result in results[1:]:
+        per_account = result["throughput"] / result["accounts"]
+        base_per_account = base["throughput"] / base["accounts"]
+
+        if result["cycle"]["p95"] > base["cycle"]["p95"] * DEGRADATION or per_account < base_per_account / DEGRADATION:
+            degraded = result
+            break
+
+        capacity_accounts = result["accounts"]
+
+    return {
+        "capacity": capacity_accounts,
+        "degraded": degraded["accounts"] if degraded else None,
+        "bottleneck": bottleneck(base, degraded or results[-1]),
+    }
+
+
+def bottleneck(base: dict, result: dict) -> str:
+    """
+    Saturated resource: database locks, CPU (GIL) or the cycle phase which grew most
+    ("none" - no phase grew more than PHASE_GROWTH)
+    """
+    if any("locked" in error for error in result["errors"]):
+        return "SQLite locks"
+
+    if result["cpu"] >= CPU_SATURATION:
+        return "CPU / GIL"
+
+    growth = {
+        phase: seconds - base["phases"].get(phase, 0.0)
+        for phase, seconds in result["phases"].items()
+    }
+    if not growth:
+        return "unknown"
+
+    phase = max(growth, key=growth.get)
+    if growth[phase] <= PHASE_GROWTH:
+        return "none"
+
+    return BOTTLENECKS.get(phase, "unknown")
+
+
+def format_report(results: List[dict], params: dict = None) -> str:
+    """ Scaling report """
+    lines = ["Modelled: one process with a thread per account (as paper trading grid), "
+             "live Application runs one account per process"]
+    if params:
+        lines.append("Load test: " + ", ".join("{}: {}".format(k, v) for k, v in params.items()))
+
+    lines.append(
+        "{:>8} {:>8} {:>9} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>5} {:>8} {:>7} {:>5} {:>6}".format(
+            "accounts", "cycles", "cycles/s", "p50 s", "p95 s", "max s",
+            "net ms", "db ms", "sleep ms", "log ms", "other ms", "db p95", "wake ms", "cpu", "rss MB", "KB/acc", "fds", "errors",
+        )
+    )
+    for r in results:
+        phases = r["phases"]
+        lines.append(
+            "{:>8} {:>8} {:>9.2f} {:>8.3f} {:>8.3f} {:>8.3f} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.4f} {:>8.2f} {:>5.2f} {:>8.1f} {:>7.1f} {:>5} {:>6}".format(
+                r["accounts"],
+                r["cycles"],
+                r["throughput"],
+                r["cycle"]["p50"],
+                r["cycle"]["p95"],
+                r["cycle"]["max"],
+                phases.get(NETWORK, 0.0) * 1000,
+                phases.get(DB, 0.0) * 1000,
+                phases.get(SLEEP, 0.0) * 1000,
+                phases.get(LOG, 0.0) * 1000,
+                phases.get("other", 0.0) * 1000,
+                r["db"]["p95"],
+                r["wake_p95"] * 1000,
+                r["cpu"],
+                r["rss"] / 2 ** 20,
+                r["rss_account"] / 2 ** 10,
+                r["fds"],
+                sum(r["errors"].values()),
+            )
+        )
+
+    errors = collections.Counter()
+    for r in results:
+        errors.update(r["errors"])
+    if errors:
+        lines.append("Errors:")
+        for error, count in errors.most_common(10):
+            lines.append("  {:>6}  {}".format(count, error))
+
+    analysis = capacity(results)
+    if analysis["degraded"] is None:
+        lines.append("Capacity: no degradation up to {} accounts, most loaded: {}".format(
+            analysis["capacity"], analysis["bottleneck"],
+        ))
+    else:
+        lines.append("Capacity: {} accounts (cycle p95 or throughput x{} worse on {} accounts), bottleneck: {}".format(
+            analysis["capacity"], DEGRADATION, analysis["degraded"], analysis["bottleneck"],
+        ))
+
+    lines.append("Note: network is simulated (latency only), sockets and connections limits are not measured")
+
+    return "\n".join(lines)
@@ -0,0 +1,307 @@
+import collections
+import itertools
+import threading
+import time
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, Iterator, List, Tuple
+
+import wexapi.models as models
+
+from dimka.bot.exchange import LiveExchange
+from dimka.bot.raw import TradeRecord, DepthLevel
+from dimka.core.utils import td
+
+# Order statuses (same as exchange)
+ORDER_ACTIVE = 0
+ORDER_EXECUTED = 1
+ORDER_CANCELED = 2
+ORDER_CANCELED_PARTIALLY = 3
+
+
+class PaperTradeError(Exception):
+    """ Simulated exchange rejected the call (same cases as the real exchange) """
+    pass
+
+
+class MarketFeed(object):
+    """
+    Public market data shared by all paper exchanges.
+    Depth and ticker are requested once per `ttl` seconds for all consumers (threads).
+    """
+
+    def __init__(self, exchange: LiveExchange = None, ttl: float = 1.0, limit: int = 150):
+        self.exchange = exchange or LiveExchange()
+        self.ttl = ttl
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.depths = {}
+        self.tickers = {}
+        self.pairs_info = {}
+
+    def pair_info(self, pair: str) -> models.PairInfo:
+        with self.lock:
+            if pair not in self.pairs_info:
+                self.pairs_info[pair] = self.exchange.pair_info(pair)
+
+            return self.pairs_info[pair]
+
+    def depth(self, pair: str, limit: int = None) -> Tuple[float, List[DepthLevel], List[DepthLevel]]:
+        """
+        :return: updated (time of the request), asks, bids
+        """
+        with self.lock:
+            cached = self.depths.get(pair)
+            if cached is None or time.time() - cached[0] > self.ttl:
+                asks, bids = self.exchange.depth(pair, self.limit)
+                cached = self.depths[pair] = (time.time(), asks, bids)
+
+        updated, asks, bids = cached
+
+        return updated, asks[:limit], bids[:limit]
+
+    def ticker(self, pair: str) -> models.Ticker:
+        with self.lock:
+            cached = self.tickers.get(pair)
+            if cached is None or time.time() - cached[0] > self.ttl:
+                cached = self.tickers[pair] = (time.time(), self.exchange.ticker(pair))
+
+            return cached[1]
+
+
+class PaperOrder(object):
+    __slots__ = ("order_id", "pair", "type", "start_amount", "amount", "rate", "timestamp_created", "status")
+
+    def __init__(self, order_id: int, pair: str, order_type: str, amount: Decimal, rate: Decimal):
+        self.order_id = order_id
+        self.pair = pair
+        self.type = order_type
+        self.start_amount = amount
+        self.amount = amount
+        self.rate = rate
+        self.timestamp_created = int(time.time())
+        self.status = ORDER_ACTIVE
+
+
+class PaperExchange(object):
+    """
+    Simulated execution backend: same interface as LiveExchange,
+    orders are filled against the live depth from the market feed, funds are virtual.
+
+    Order is filled immediately by the depth levels it crosses, remains are placed
+    to the (virtual) order book and filled when the depth crosses the order price.
+    Resting orders are matched on any call. Filled amounts are taken from the depth snapshot
+    levels, so the same liquidity is not filled twice until the next snapshot.
+    Exchange fee (pair info) is taken from the received currency.
+    Currencies missing in the initial funds have zero balance.
+    """
+
+    def __init__(self, feed: MarketFeed, funds: Dict[str, Decimal]):
+        self.feed = feed
+        self.balances = collections.defaultdict(Decimal)
+        self.balances.update({name: Decimal(str(value)) for name, value in funds.items()})
+        self.orders = {}
+        self.history = []
+        self.next_order_id = 1
+        self.next_trade_id = 1
+        self.books = {}
+
+    def pair_info(self, pair: str) -> models.PairInfo:
+        return self.feed.pair_info(pair)
+
+    def funds(self) -> Dict[str, Decimal]:
+        self.match()
+
+        return collections.defaultdict(Decimal, self.balances)
+
+    def active_orders(self, pair: str) -> List[models.Order]:
+        self.match()
+
+        return [
+            models.Order(o.order_id, o.pair, o.type, o.amount, o.rate, o.timestamp_created, o.status)
+            for o in self.orders.values()
+            if o.pair == pair and o.status == ORDER_ACTIVE
+        ]
+
+    def trade(self, pair: str, trade_type: str, rate: Decimal, amount: Decimal) -> models.TradeResult:
+        base, quote = pair.split("_")
+        pair_info = self.pair_info(pair)
+        # rate and amount are truncated to the pair decimal places (same as trade API client)
+        rate = td(rate, pair_info.decimal_places, ROUND_DOWN)
+        amount = td(amount, pair_info.decimal_places, ROUND_DOWN)
+
+        if amount < pair_info.min_amount:
+            raise PaperTradeError("Value {} must be greater than {} {}.".format(base, pair_info.min_amount, base))
+
+        if trade_type == "buy":
+            currency, reserve = quote, amount * rate
+        elif trade_type == "sell":
+            currency, reserve = base, amount
+        else:
+            raise PaperTradeError("Unknown trade type: {}".format(trade_type))
+
+        if self.balances.get(currency, Decimal(0)) < reserve:
+            raise PaperTradeError("It is not enough {} in the account for {}.".format(currency, trade_type))
+
+        self.balances[currency] -= reserve
+
+        order = PaperOrder(self.next_order_id, pair, trade_type, amount, rate)
+        self.next_order_id += 1
+        self.orders[order.order_id] = order
+
+        asks, bids = self.book(pair)
+        received = self.fill(order, asks if trade_type == "buy" else bids, taker=True)
+
+        # 0 - order was completely satisfied with the counter orders
+        order_id = order.order_id if order.status == ORDER_ACTIVE else 0
+
+        return models.TradeResult(received, order.amount, order_id, dict(self.balances))
+
+    def cancel_order(self, order_id: int) -> models.CancelOrderResult:
+        self.match()
+
+        order = self.orders.get(order_id)
+        if order is None or order.status != ORDER_ACTIVE:
+            raise PaperTradeError("bad status")
+
+        base, quote = order.pair.split("_")
+        if order.type == "buy":
+            self.balances[quote] += order.amount * order.rate
+        else:
+            self.balances[base] += order.amount
+
+        order.status = ORDER_CANCELED if order.amount == order.start_amount else ORDER_CANCELED_PARTIALLY
+
+        return models.CancelOrderResult(order_id, dict(self.balances))
+
+    def order_info(self, order_id: int) -> models.OrderInfo:
+        self.match()
+
+        o = self.orders.get(order_id)
+        if o is None:
+            raise PaperTradeError("invalid order")
+
+        return models.OrderInfo(o.order_id, o.pair, o.type, o.start_amount, o.amount, o.rate, o.timestamp_created, o.status)
+
+    def trade_history(self, pair: str, count: int) -> Iterator[TradeRecord]:
+        self.match()
+
+        items = (item for item in reversed(self.history) if item[1]["pair"] == pair)
+
+        return (TradeRecord(trade_id, item) for trade_id, item in itertools.islice(items, count))
+
+    def depth(self, pair: str, limit: int) -> Tuple[List[DepthLevel], List[DepthLevel]]:
+        _, asks, bids = self.feed.depth(pair, limit)
+
+        return asks, bids
+
+    def ticker(self, pair: str) -> models.Ticker:
+        return self.feed.ticker(pair)
+
+    def equity(self, pair: str) -> Decimal:
+        """ Account value in the quote currency (by the top BUY price), including active orders """
+        base, quote = pair.split("_")
+        _, _, bids = self.feed.depth(pair, 1)
+        price = bids[0].price if bids else Decimal(0)
+
+        # can be called from the other thread
+        balances = dict(self.balances)
+        value = balances.get(quote, Decimal(0)) + balances.get(base, Decimal(0)) * price
+        for order in list(self.orders.values()):
+            if order.pair == pair and order.status == ORDER_ACTIVE:
+                value += order.amount * (order.rate if order.type == "buy" else price)
+
+        return value
+
+    def book(self, pair: str) -> Tuple[List[list], List[list]]:
+        """
+        Depth snapshot with the liquidity left after fills of this exchange
+
+        :return: asks, bids: lists of [price, amount] levels
+        """
+        updated, asks, bids = self.feed.depth(pair)
+
+        book = self.books.get(pair)
+        if book is None or book[0] != updated:
+            book = self.books[pair] = (
+                updated,
+                [[level.price, level.amount] for level in asks],
+                [[level.price, level.amount] for level in bids],
+            )
+
+        return book[1], book[2]
+
+    def match(self):
+        """ Fill resting orders by the depth liquidity """
+        for pair in {o.pair for o in self.orders.values() if o.status == ORDER_ACTIVE}:
+            asks, bids = self.book(pair)
+
+            for order in list(self.orders.values()):
+                if order.pair == pair and order.status == ORDER_ACTIVE:
+                    self.fill(order, asks if order.type == "buy" else bids, taker=False)
+
+    def fill(self, order: PaperOrder, levels: List[list], taker: bool) -> Decimal:
+        """
+        Fill order by the crossed depth levels, filled amount is taken from the levels.
+        Taker (new order) is filled by the levels prices, resting order - by its own price.
+
+        :return: received amount (base for BUY, quote for SELL)
+        """
+        base, quote = order.pair.split("_")
+        fee = Decimal(1) - Decimal(str(self.pair_info(order.pair).fee)) / 100
+        received = Decimal(0)
+
+        for level in levels:
+            level_price, level_amount = level
+            if order.amount <= 0:
+                break
+            if (order.type == "buy" and level_price > order.rate) or (order.type == "sell" and level_price < order.rate):
+                break
+            if level_amount <= 0:
+                continue
+
+            price = level_price if taker else order.rate
+            amount = min(order.amount, level_amount)
+            order.amount -= amount
+            level[1] -= amount
+
+            if order.type == "buy":
+                received += amount * fee
+                self.balances[base] += amount * fee
+                # reserved by the order price, executed by the level price
+                self.balances[quote] += amount * (order.rate - price)
+            else:
+                received += amount * price * fee
+                self.balances[quote] += amount * price * fee
+
+            self.history.append((self.next_trade_id, {
+                "pair": order.pair,
+                "type": order.type,
+                "amount": amount,
+                "rate": price,
+                "order_id": order.order_id,
+                "is_your_order": 1,
+                "timestamp": int(time.time()),
+            }))
+            self.next_trade_id += 1
+
+        if order.amount <= 0:
+            order.status = ORDER_EXECUTED
+
+        return received
+
+
+def variants(grid: str) -> List[Dict[str, str]]:
+    """
+    Bot arguments variants (cartesian product) from the grid definition
+
+    >>> variants("step=2,3;iters=5")
+    [{'step': '2', 'iters': '5'}, {'step': '3', 'iters': '5'}]
+    """
+    names = []
+    values = []
+    for part in filter(None, (p.strip() for p in grid.split(";"))):
+        name, _, options = part.partition("=")
+        names.append(name.strip().replace("-", "_"))
+        values.append([v.strip() for v in options.split(",") if v.strip()])
+
+    return [dict(zip(names, product)) for product in itertools.product(*values)]
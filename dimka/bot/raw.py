@@ -0,0 +1,117 @@
+import json
+from decimal import Decimal
+from typing import Iterator, List, Tuple, Union
+
+from wexapi.common import WexConnection
+from wexapi.public import PublicApi
+from wexapi.trade import TradeApi
+
+
+class RawConnection(WexConnection):
+    """
+    Connection which parses JSON response once, without Decimal conversion:
+    floats are kept as str (exact value), ints as int.
+    """
+
+    def make_json_request(self, url: str, extra_headers=None, params: str = "") -> dict:
+        response = self.make_request(url, extra_headers, params)
+        data = response.read().decode('utf-8')
+
+        try:
+            return json.loads(data, parse_float=str)
+        except ValueError as e:
+            raise Exception("Error while attempting to parse JSON response: {}\nResponse:\n{!r}".format(e, data))
+
+
+class TradeRecord(object):
+    """
+    Trade history item.
+    amount and rate are converted to Decimal on first access.
+    """
+    __slots__ = ("trade_id", "pair", "type", "_amount", "_rate", "order_id", "is_your_order", "timestamp")
+
+    def __init__(self, trade_id: int, item: dict):
+        self.trade_id = trade_id
+        self.pair = item.get("pair")
+        self.type = item.get("type")
+        self._amount = item.get("amount")
+        self._rate = item.get("rate")
+        self.order_id = item.get("order_id")
+        self.is_your_order = bool(item.get("is_your_order"))
+        self.timestamp = item.get("timestamp")
+
+    @property
+    def amount(self) -> Decimal:
+        if not isinstance(self._amount, Decimal):
+            self._amount = Decimal(self._amount)
+
+        return self._amount
+
+    @property
+    def rate(self) -> Decimal:
+        if not isinstance(self._rate, Decimal):
+            self._rate = Decimal(self._rate)
+
+        return self._rate
+
+
+class DepthLevel(object):
+    """
+    Depth (order book) level.
+    price and amount are converted to Decimal on first access.
+    """
+    __slots__ = ("_price", "_amount")
+
+    def __init__(self, price: Union[str, int], amount: Union[str, int]):
+        self._price = price
+        self._amount = amount
+
+    @property
+    def price(self) -> Decimal:
+        if not isinstance(self._price, Decimal):
+            self._price = Decimal(self._price)
+
+        return self._price
+
+    @property
+    def amount(self) -> Decimal:
+        if not isinstance(self._amount, Decimal):
+            self._amount = Decimal(self._amount)
+
+        return self._amount
+
+
+class RawTradeApi(TradeApi):
+    """ Trade API with compact (lazy decoded) responses. Should be used with RawConnection """
+
+    def trade_history_records(
+            self,
+            count_number: int = None,
+            order: str = "DESC",
+            pair: str = None,
+    ) -> Iterator[TradeRecord]:
+        """
+        Trade history records.
+        Request is made immediately, records are created while iterating.
+        """
+        params = self._format_history_params(count_number=count_number, order=order)
+        params["method"] = "TradeHistory"
+
+        if pair is not None:
+            self.apiInfo.validate_pair(pair)
+            params["pair"] = pair
+
+        items = self._post(params)
+
+        return (TradeRecord(int(k), v) for k, v in items.items())
+
+
+def depth_levels(connection: RawConnection, pair: str, limit: int = 150) -> Tuple[List[DepthLevel], List[DepthLevel]]:
+    """
+    Retrieve the depth for the given pair.
+
+    :return: asks, bids
+    """
+    asks, bids = PublicApi(connection).get_depth(pair, limit=limit)
+
+    return [DepthLevel(*level) for level in asks], [DepthLevel(*level) for level in bids]
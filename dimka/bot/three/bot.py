@@ -1,17 +1,66 @@
+import textwrap
 from decimal import Decimal
-import time
-from typing import Union, Tuple
-import wexapi
+from typing import Union, Tuple, List
 
 from dimka.bot.base_bot import BaseBot
 from dimka.core.app import RestartBotException
 import dimka.core.models as models
 from dimka.core.utils import td
+from dimka.core.log import LazyDecimal
+from dimka.core.tracing import traced, DB
 
 import wexapi.models as wex_models
 
 MAX_ORDERS = 3
 
+# Order statuses
+ORDER_ACTIVE = 0
+
+# Journal phases
+PHASE_BUY = "buy"
+PHASE_SELL = "sell"
+PHASE_LADDER = "ladder"
+
+
+def add_arguments(parser):
+    """ Bot console arguments (Application or ArgumentParser) """
+    parser.add_argument(
+        '--step',
+        default=3,
+        type=int,
+        help='Percent. Sell order price increase step.'
+    )
+    parser.add_argument(
+        '--iters',
+        default=5,
+        type=int,
+        help=textwrap.dedent('''\
+            Iterations quantity to waiting order execution. After all iterations order will be canceled.
+                This is bot working flow with BUY orders.
+                Bot waiting while order will be executed to place SELL order right after that.
+                If BUY order is not executed after all iteration, we can suppose that this order is not on top now.
+                So it can be canceled and new order can be placed. 
+        '''),
+    )
+    parser.add_argument(
+        '--iters-time',
+        default=5,
+        type=int,
+        help='Time in seconds to hold iteration before start new one.',
+    )
+    parser.add_argument(
+        '--high-diff',
+        default=50,
+        type=int,
+        help=textwrap.dedent('''\
+            Percent. Difference from highest price when BUY allowed.
+            Example:
+                - high: 10, low: 9, high-diff: 50 (pct) - buy allowed if price less then 9.5
+                - high: 10, low: 9, high-diff: 10 (pct) - buy allowed if price less then 9.9
+                - high: 10, low: 9, high-diff: 0 (pct) - buy allowed if price less then 10
+        '''),
+    )
+
 
 class Bot(BaseBot):
     """
@@ -19,20 +68,25 @@ class Bot(BaseBot):
     """
 
     def run(self):
-        self.logger.success('************* "{}" bot started: {} *************'.format(
+        self.logger.success(
+            '************* "%s" bot started: %s *************',
             self.params.get('bot_name'),
             self.pair,
-        ))
+        )
+
+        if self.journal.phase is not None:
+            self.resume()
+            return
 
         # Bot parameters
         base, quote = self.split_pair()
         base_funds, quote_funds = self.funds()
         self.logger.verbose("Available funds")
-        self.logger.verbose("  Base: ({}): {:f}".format(base, td(base_funds, self.units())))
-        self.logger.verbose("  Quote ({}): {:f}".format(quote, td(quote_funds, self.units())))
+        self.logger.verbose("  Base: (%s): %s", base, LazyDecimal(base_funds, self.units()))
+        self.logger.verbose("  Quote (%s): %s", quote, LazyDecimal(quote_funds, self.units()))
 
         sell_orders = self.active_orders('sell')
-        self.logger.success("Active SELL orders: {}".format(len(sell_orders)))
+        self.logger.success("Active SELL orders: %s", len(sell_orders))
         self.show_orders_info(sell_orders)
 
         self.cancel_buy_orders()
@@ -45,14 +99,13 @@ class Bot(BaseBot):
             # Calculate allowed buy price and create buy order
             # Waiting for it execution or restart bot
             top_price = self.top_sell_price()
-            self.logger.success("  Top SELL price: {:f}".format(
-                td(top_price, self.pair_info.decimal_places)
-            ))
-            self.logger.success("  Increase unit: {:f}".format(self.get_price_unit()))
-            price = top_price - self.get_price_unit()
-            self.logger.success("  BUY price: {:f}".format(price))
+            self.logger.success("  Top SELL price: %s", LazyDecimal(top_price, self.pair_info.decimal_places))
+            price_unit = self.get_price_unit()
+            self.logger.success("  Increase unit: %s", LazyDecimal(price_unit, self.pair_info.decimal_places))
+            price = top_price - price_unit
+            self.logger.success("  BUY price: %s", LazyDecimal(price, self.pair_info.decimal_places))
             amount = td(quote_funds / price, self.units())
-            self.logger.success("  BUY amount: {:f}".format(amount))
+            self.logger.success("  BUY amount: %s", LazyDecimal(amount, self.units()))
 
             buy_allowed, message = self.is_buy_allowed(price)
             if not self.is_buy_allowed(price):
@@ -60,30 +113,83 @@ class Bot(BaseBot):
 
             self.logger.success("Start BUY")
             order = self.create_buy_order(price, amount)
-            time.sleep(1)
+            self.journal_write(phase=PHASE_BUY, order_id=order.order_id)
+            self.sleep(1)
 
-            buy_state, order_info = self.waiting_order_execution(
-                order.order_id,
-                'buy',
-                self.args.iters,
-                self.args.iters_time,
-            )
-            if buy_state:
-                last_buy_order = self.save_order(order_info)
+            last_buy_order = self.wait_buy_order(order.order_id)
+
+        self.sell(last_buy_order)
+
+    def resume(self):
+        """
+        Resume bot from the journaled state (after restart),
+        without funds/orders/history re-discovery and without canceling waited order.
+        If resume fails, journal is cleared and next run starts from scratch.
+        """
+        state = self.journal.state
+        phase = state.get("phase")
+        self.logger.success("Resume from journal: %s", phase)
+
+        try:
+            if phase == PHASE_BUY:
+                self.sell(self.wait_buy_order(state.get("order_id")))
+            elif phase == PHASE_SELL:
+                self.sell(self.get_local_order(state.get("parent_order")))
+            elif phase == PHASE_LADDER:
+                self.place_sell_orders(
+                    [Decimal(price) for price in state.get("prices")],
+                    Decimal(state.get("amount")),
+                    self.get_local_order(state.get("parent_order")),
+                    state.get("placed"),
+                    reconcile=True,
+                )
             else:
-                self.logger.success("  Cancel order #{}".format(order_info.order_id))
-                self.cancel_order(order_info.order_id)
+                self.logger.warning("Unknown journal phase: %s", phase)
+                self.journal_clear()
+        except RestartBotException:
+            raise
+        except Exception:
+            self.journal_clear()
+            raise
+
+    def wait_buy_order(self, order_id: int) -> Union[None, models.OrderInfo]:
+        """
+        Waiting for BUY order execution, cancel it if it's not executed
 
-        # SELL
+        :return: executed order saved to the DB
+        """
+        last_buy_order = None
+        buy_state, order_info = self.waiting_order_execution(
+            order_id,
+            'buy',
+            self.args.iters,
+            self.args.iters_time,
+        )
+        if buy_state:
+            last_buy_order = self.save_order(order_info)
+        elif order_info.status == ORDER_ACTIVE:
+            self.logger.success("  Cancel order #%s", order_info.order_id)
+            self.cancel_order(order_info.order_id)
+
+        self.journal_write(
+            phase=PHASE_SELL,
+            parent_order=last_buy_order.id if last_buy_order else None,
+        )
+
+        return last_buy_order
+
+    def sell(self, last_buy_order: models.OrderInfo = None):
+        """ Place SELL orders for all available base funds """
+        base, quote = self.split_pair()
         self.logger.success("Starting SELL")
         base_funds, quote_funds = self.funds()
         self.logger.verbose("Available funds")
-        self.logger.verbose("  Base: ({}): {:f}".format(base, td(base_funds, self.units())))
-        self.logger.verbose("  Quote ({}): {:f}".format(quote, td(quote_funds, self.units())))
+        self.logger.verbose("  Base: (%s): %s", base, LazyDecimal(base_funds, self.units()))
+        self.logger.verbose("  Quote (%s): %s", quote, LazyDecimal(quote_funds, self.units()))
         if base_funds > self.pair_info.min_amount:
             # sell_amount = base_funds / Decimal(str(MAX_ORDERS - sell_len))
             sell_amount = base_funds
-            self.logger.success("  Sell amount: {:f}".format(td(sell_amount, self.units())))
+            self.logger.success("  Sell amount: %s", LazyDecimal(sell_amount, self.units()))
 
             if not last_buy_order:
                 last_buy_order = self.get_last_local_buy_order()
@@ -98,40 +204,109 @@ class Bot(BaseBot):
                     orders_count = i
                     break
 
-            self.logger.success("    quantity: {}, order amount: {:f}".format(
+            self.logger.success(
+                "    quantity: %s, order amount: %s",
                 orders_count,
-                td(order_amount, self.units())
-            ))
+                LazyDecimal(order_amount, self.units()),
+            )
 
             sell_factor = Decimal(str(self.args.step / 100))
             self.logger.debug("  Calculate SELL price")
             prev_price = self.find_sell_price(last_buy_order)
+            prices = []
             for i in range(0, orders_count, 1):
-                self.logger.debug("  Order #{}".format(i + 1))
+                self.logger.debug("  Order #%s", i + 1)
                 step_amount = sell_factor * prev_price
-                self.logger.debug("    Step amount: {:f}".format(td(step_amount, self.pair_info.decimal_places)))
+                self.logger.debug("    Step amount: %s", LazyDecimal(step_amount, self.pair_info.decimal_places))
                 sell_price = prev_price + step_amount
                 prev_price = sell_price
-                self.logger.debug("    SELL price: {:f}".format(td(sell_price, self.pair_info.decimal_places)))
-
-                sell_res = self.create_sell_order(sell_price, order_amount)
-                time.sleep(1)
-
-                if not sell_res.order_id:
-                    order = self.get_last_order_from_history('sell')
-                else:
-                    with wexapi.common.WexConnection() as conn:
-                        t = wexapi.trade.TradeApi(self.key, self.key_handler, conn)
-                        order = t.order_info(sell_res.order_id)
+                self.logger.debug("    SELL price: %s", LazyDecimal(sell_price, self.pair_info.decimal_places))
+                prices.append(sell_price)
 
-                self.save_order(order, last_buy_order)
+            self.place_sell_orders(prices, order_amount, last_buy_order)
         else:
+            self.journal_clear()
             msg = "{} funds is not enough to open SELL order. Min. amount is: {}".format(
                 td(base_funds, self.units()),
                 td(self.pair_info.min_amount, self.units()),
             )
             raise RestartBotException(msg, timeout=10)
 
+    def place_sell_orders(
+            self,
+            prices: List[Decimal],
+            amount: Decimal,
+            last_buy_order: models.OrderInfo = None,
+            placed: int = 0,
+            reconcile: bool = False,
+    ):
+        """
+        Place SELL orders ladder
+
+        :param prices: SELL orders prices
+        :param amount: each order amount
+        :param last_buy_order: parent BUY order
+        :param placed: already placed orders count (resume)
+        :param reconcile: check that next order is not placed yet (journal can be behind the exchange)
+        """
+        for i in range(placed, len(prices)):
+            self.journal_write(
+                phase=PHASE_LADDER,
+                parent_order=last_buy_order.id if last_buy_order else None,
+                amount=amount,
+                prices=prices,
+                placed=i,
+            )
+
+            if reconcile and i == placed:
+                order = self.find_sell_order(prices[i])
+                if order is not None:
+                    # placed before restart, can be not saved yet
+                    self.logger.success("  SELL order #%s is already placed", i + 1)
+                    if self.get_local_sell_order(order, last_buy_order) is None:
+                        self.save_order(order, last_buy_order)
+                    continue
+
+            sell_res = self.create_sell_order(prices[i], amount)
+            self.sleep(1)
+
+            if not sell_res.order_id:
+                order = self.get_last_order_from_history('sell')
+            else:
+                order = self.order_info(sell_res.order_id)
+
+            self.save_order(order, last_buy_order)
+
+        self.journal_clear()
+
+    def find_sell_order(self, price: Decimal) -> Union[None, wex_models.Order]:
+        """ Active SELL order with given price """
+        rate = td(price, self.pair_info.decimal_places)
+        for order in self.active_orders('sell'):
+            if td(order.rate, self.pair_info.decimal_places) == rate:
+                return order
+
+        return None
+
+    @traced("get_local_sell_order", category=DB)
+    def get_local_sell_order(
+            self,
+            order: wex_models.Order,
+            parent_order: models.OrderInfo = None,
+    ) -> Union[None, models.OrderInfo]:
+        """ Local SELL order saved for the exchange order """
+        rate = td(order.rate, self.pair_info.decimal_places)
+        query = models.OrderInfo.select().where(
+            models.OrderInfo.order_type == 'sell',
+            models.OrderInfo.pair == order.pair,
+            models.OrderInfo.parent_order == parent_order,
+        )
+        for local in query:
+            if td(local.rate, self.pair_info.decimal_places) == rate:
+                return local
+
+        return None
+
     def is_buy_allowed(self, price: Decimal) -> Tuple[bool, str]:
         """
         Check is buy allowed
@@ -159,14 +334,15 @@ class Bot(BaseBot):
             None: Only output info by logger
         """
         for order in orders:
-            self.logger.verbose("  Order #{}".format(order.order_id))
-            self.logger.verbose("    pair:{} | type:{} | amount:{:f} | rate:{:f} | status:{}".format(
+            self.logger.verbose("  Order #%s", order.order_id)
+            self.logger.verbose(
+                "    pair:%s | type:%s | amount:%s | rate:%s | status:%s",
                 order.pair,
                 order.type,
-                td(order.amount, self.units()),
-                td(order.rate, self.pair_info.decimal_places),
+                LazyDecimal(order.amount, self.units()),
+                LazyDecimal(order.rate, self.pair_info.decimal_places),
                 order.status,
-            ))
+            )
 
     def waiting_order_execution(
             self,
@@ -189,52 +365,47 @@ class Bot(BaseBot):
                     - first value: order execution state: True - executed, False - not executed
                     - second value: wex_models.Order or False (if order_id == 0)
         """
-        with wexapi.common.WexConnection() as conn:
-            t = wexapi.trade.TradeApi(self.key, self.key_handler, conn)
+        # 0 - order was completely satisfied with the counter orders
+        # this mean that we can get order id from last deal (trade history)
+        if not order_id:
+            order_id = self.get_last_order_from_history(order_type).order_id
 
-            # 0 - order was completely satisfied with the counter orders
-            # this mean that we can get order id from last deal (trade history)
-            if not order_id:
-                order_id = self.get_last_order_from_history(order_type).order_id
+        self.logger.debug("Waiting for order #%s execution ...", order_id)
+        order_info = self.order_info(order_id)
 
-            self.logger.debug("Waiting for order #{} execution ...".format(order_id))
-            order_info = t.order_info(order_id)
+        while iter_count > 0:
+            self.sleep(iter_time)
 
-            while iter_count > 0:
-                time.sleep(iter_time)
-
-                if order_info.status == 1:
-                    # order executed. Exist from while
-                    iter_count = 0
-                else:
-                    iter_count -= 1
+            if order_info.status == 1:
+                # order executed. Exist from while
+                iter_count = 0
+            else:
+                iter_count -= 1
 
-                self.logger.debug("  Left iterations: {}".format(iter_count))
+            self.logger.debug("  Left iterations: %s", iter_count)
 
-                self.show_orders_info([order_info])
+            self.show_orders_info([order_info])
 
-                order_info = t.order_info(order_id)
-            else:
-                return order_info.status == 1, order_info
+            order_info = self.order_info(order_id)
+        else:
+            return order_info.status == 1, order_info
 
     def get_last_order_from_history(self, order_type: str) -> Union[None, wex_models.Order]:
         """
         :param order_type: buy OR sell
         """
-        with wexapi.common.WexConnection() as conn:
-            t = wexapi.trade.TradeApi(self.key, self.key_handler, conn)
-            history = t.trade_history(pair=self.pair, count_number=100)
-            for item in history:
-                if item.is_your_order and item.type == order_type:
-                    return t.order_info(item.order_id)
-
-            # raise Exception(
-            #     "Wex history doesn't contains {} order for pair {}. Are you doing something wrong?".format(
-            #         type,
-            #         self.pair,
-            #     )
-            # )
-            return None
+        item = self.find_history_item(lambda record: record.is_your_order and record.type == order_type)
+
+        if item is not None:
+            return self.order_info(item.order_id)
+
+        # raise Exception(
+        #     "Wex history doesn't contains {} order for pair {}. Are you doing something wrong?".format(
+        #         type,
+        #         self.pair,
+        #     )
+        # )
+        return None
 
     def find_sell_price(self, last_buy_order: models.OrderInfo = None):
         if not last_buy_order:
@@ -242,18 +413,27 @@ class Bot(BaseBot):
 
         return last_buy_order.rate
 
+    @traced("get_local_order", category=DB)
+    def get_local_order(self, order_id: int = None) -> Union[None, models.OrderInfo]:
+        """ Get local order by id """
+        if not order_id:
+            return None
+
+        return models.OrderInfo.get_or_none(models.OrderInfo.id == order_id)
+
     def get_last_local_buy_order(self) -> Union[None, models.OrderInfo]:
         last_hist_order = self.get_last_order_from_history('buy')
 
         result = None
         if last_hist_order:
-            try:
-                result = (models.OrderInfo
-                          .select()
-                          .where(models.OrderInfo.order_type == 'buy', models.OrderInfo.pair == self.pair)
-                          .order_by(models.OrderInfo.created.desc())
-                          .get())
-            except models.DoesNotExist:
-                pass
+            with self.tracer.span("get_last_local_buy_order", pair=self.pair, category=DB):
+                try:
+                    result = (models.OrderInfo
+                              .select()
+                              .where(models.OrderInfo.order_type == 'buy', models.OrderInfo.pair == self.pair)
+                              .order_by(models.OrderInfo.created.desc())
+                              .get())
+                except models.DoesNotExist:
+                    pass
 
         return result
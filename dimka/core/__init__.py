@@ -1,4 +1,6 @@
 from dimka.core.utils import *
 from dimka.core.app import *
+from dimka.core.log import *
+from dimka.core.journal import *
 from dimka.core.config import *
 from dimka.core.models import *
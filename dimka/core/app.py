@@ -1,9 +1,20 @@
 import argparse
+import atexit
+import copy
+import signal
+import sys
+import threading
 import time
 import logging
+import verboselogs
 import wexapi
 import os
-from dimka.core import config, models
+from typing import List, Tuple
+from dimka.core import config, models, storage
+from dimka.core.log import LazyDecimal
+
+# Paper trading equity report interval (seconds)
+PAPER_REPORT_INTERVAL = 60
 
 
 class Application:
@@ -18,40 +29,132 @@ class Application:
 
         self.args = None
         self.pair_info = None
+        self.storage = None
 
     def init(self):
         self.args = self.__arg_parser.parse_args()
-        self.__init_logger()
+        self.__cli_args = dict(vars(self.args))
         self.__parse_config()
+        self.__init_logger()
+        self.config.init_tracer()
         self.__init_db_conn()
+        atexit.register(self.__close_db_conn)
+        # graceful shutdown on "docker stop" / supervisor: flush logs, database snapshot
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        self.__apply_args(self.config.params.get("args") or {})
 
         self.config.params['bot_name'] = self.bot_name
 
     def run(self):
+        if self.args.paper:
+            self.run_paper()
+            return
+
         key_path = self.config.params.get("key_path")
         with wexapi.keyhandler.KeyHandler(key_path) as handler:
             for key in handler.keys:
-                name = "dimka.bot.{}.bot".format(self.bot_name.lower())
-                mod = __import__(name, fromlist=[''])
-                class_ = getattr(mod, "Bot")
-                bot = class_(key, handler, self.config, self.args)
-
-                while True:
-                    try:
-                        bot.run()
-
-                        time.sleep(15)
-                    except RestartBotException as e:
-                        self.log.warning(str(e))
-                        self.log.warning("Restart Bot")
-                        time.sleep(e.timeout)
-                        continue
-                    except NotImplementedError as e:
-                        self.log.error("{}".format(e))
-                        break
-                    except Exception as e:
-                        self.log.exception("An error occurred: {}".format(e))
-                        time.sleep(5)
+                bot = self.create_bot(key, handler, self.config, self.args)
+                self.run_bot(bot)
+
+    def create_bot(self, key, handler, conf: config.Config, args: argparse.Namespace, exchange=None):
+        """ Create bot instance """
+        name = "dimka.bot.{}.bot".format(self.bot_name.lower())
+        mod = __import__(name, fromlist=[''])
+        class_ = getattr(mod, "Bot")
+
+        return class_(key, handler, conf, args, exchange)
+
+    def run_bot(self, bot, reload_config: bool = True):
+        """ Bot cycles loop """
+        log = bot.logger
+        while True:
+            try:
+                if reload_config:
+                    self.__reload_config()
+                with self.config.tracer.span("cycle", bot=self.bot_name, pair=bot.pair):
+                    bot.run()
+
+                time.sleep(15)
+            except RestartBotException as e:
+                log.warning("%s", e)
+                log.warning("Restart Bot")
+                time.sleep(e.timeout)
+                continue
+            except NotImplementedError as e:
+                log.error("%s", e)
+                break
+            except Exception as e:
+                log.exception("An error occurred: %s", e)
+                time.sleep(5)
+
+    def run_paper(self):
+        """
+        Paper trading: bot variants (--paper-grid) trade virtual funds (paper_funds config)
+        against the live market data, one thread per variant.
+        All variants share one market data feed, so the grid costs the public API calls of one bot.
+        Config reload is disabled.
+        """
+        from dimka.bot import paper
+
+        feed = paper.MarketFeed()
+        funds = self.config.params.get("paper_funds") or {}
+        grid = paper.variants(self.args.paper_grid) if self.args.paper_grid else [{}]
+        pair = self.config.params.get("pair")
+
+        exchanges = {}
+        for variant in grid:
+            name = ",".join("{}={}".format(k, v) for k, v in variant.items()) or "default"
+            exchange = paper.PaperExchange(feed, funds)
+            exchanges[name] = (exchange, exchange.equity(pair))
+
+            thread = threading.Thread(
+                target=self.__run_paper_bot,
+                args=(name, self.__variant_args(variant), exchange),
+                name="paper[{}]".format(name),
+                daemon=True,
+            )
+            thread.start()
+
+        while True:
+            time.sleep(PAPER_REPORT_INTERVAL)
+
+            self.log.success("Paper trading equity (%s):", pair)
+            for name, (exchange, start) in sorted(exchanges.items()):
+                equity = exchange.equity(pair)
+                self.log.success(
+                    "  %s: %s (%+.2f%%)",
+                    name,
+                    LazyDecimal(equity, int(self.config.params.get("pair_units", 8))),
+                    (equity - start) / start * 100 if start else 0,
+                )
+
+    def __run_paper_bot(self, name: str, args: argparse.Namespace, exchange):
+        """ Paper trading variant thread """
+        # variant logger (same handlers) and config without the shared journal file
+        conf = copy.copy(self.config)
+        conf.params = dict(self.config.params, journal_path=None)
+        conf.log = verboselogs.VerboseLogger("{}[{}]".format(self.bot_name, name), self.log.level)
+        for handler in self.log.handlers:
+            conf.log.addHandler(handler)
+
+        # in-memory database of this thread (peewee connection per thread)
+        models.database.create_tables([
+            models.OrderInfo,
+            models.Ticker,
+        ])
+
+        self.run_bot(self.create_bot(None, None, conf, args, exchange), reload_config=False)
+
+    def __variant_args(self, variant: dict) -> argparse.Namespace:
+        """ Console arguments with the variant values (converted by the arguments parser) """
+        argv = [self.args.config] + ["--{}={}".format(k.replace("_", "-"), v) for k, v in variant.items()]
+        parsed = self.__arg_parser.parse_args(argv)
+
+        args = copy.copy(self.args)
+        for name in variant:
+            setattr(args, name, getattr(parsed, name))
+
+        return args
 
     def add_argument(self, *args, **kwargs):
         """
@@ -66,22 +169,79 @@ class Application:
 
     def __init_logger(self):
         """ Initialize application logger """
-        level = logging.WARNING
+        self.log = self.config.init_logger(self.__log_level(), self.bot_name)
+
+    def __log_level(self) -> int:
         if self.args.debug is True:
-            level = logging.DEBUG
+            return logging.DEBUG
+
+        return logging.WARNING
+
+    def __reload_config(self):
+        """
+        Apply config file changes between bot cycles.
+        Bot keeps its state, connections and opened orders.
+        """
+        changes = self.config.reload()
+
+        for name, value in changes.items():
+            self.log.notice("Config reloaded: %s = %s", name, value)
+
+        if "db_path" in changes:
+            self.__init_db_conn()
+
+        if "args" in changes:
+            try:
+                self.__apply_args(changes["args"] or {})
+            except config.ConfigError as e:
+                self.log.error("Invalid config args, previous values are kept: %s", e)
+
+    def __apply_args(self, args: dict):
+        """
+        Override console arguments by config "args" section.
+        Values are converted and validated by the arguments parser (ConfigError on the invalid value).
+        Log level is updated by "debug" argument.
+        """
+        parsed, names = self.__arg_parser.parse_config_args([self.__cli_args["config"]], args, self.log)
+
+        for name, value in self.__cli_args.items():
+            setattr(self.args, name, value)
+
+        for name in names:
+            setattr(self.args, name, getattr(parsed, name))
 
-        self.log = self.config.init_logger(level, self.bot_name)
+        self.log.setLevel(self.__log_level())
 
     def __init_db_conn(self):
         """ Initialize database """
+        if self.args.paper:
+            # each paper bot thread creates its own in-memory database
+            self.log.notice("Initialize database: in memory (paper trading)")
+            self.__close_db_conn()
+            models.database.init(":memory:")
+            return
+
         db_path = self.config.params.get("db_path")
         create = not os.path.isfile(db_path)
 
         self.log.notice("Initialize database:")
-        self.log.notice("  DB Path: {}".format(db_path))
+        self.log.notice("  DB Path: %s", db_path)
 
         db = models.database
-        db.init(db_path)
+        self.__close_db_conn()
+
+        db_storage = self.config.params.get("db_storage", "disk")
+        if db_storage == "memory":
+            interval = self.config.params.get("db_snapshot_interval", 60)
+            self.log.notice("  Storage: memory, snapshot interval: %ss", interval)
+
+            self.storage = storage.MemoryStorage(db, db_path, interval, self.log)
+            create = not self.storage.open()
+        elif db_storage == "disk":
+            db.init(db_path)
+        else:
+            raise config.ConfigError("Unknown db_storage: {}".format(db_storage))
+
         if create:
             self.log.notice("  Create tables")
             db.create_tables([
@@ -89,9 +249,20 @@ class Application:
                 models.Ticker,
             ])
 
+            if self.storage is not None:
+                self.storage.snapshot()
+
+    def __close_db_conn(self):
+        """ Close database (with the final snapshot of in-memory database) """
+        if self.storage is not None:
+            self.storage.close()
+            self.storage = None
+        elif not models.database.is_closed():
+            models.database.close()
+
     def __init_default_arguments(self):
         """ Initialize ArgumentParser and set default arguments """
-        self.__arg_parser = argparse.ArgumentParser(
+        self.__arg_parser = ArgumentParser(
             formatter_class=argparse.RawTextHelpFormatter
         )
         self.__arg_parser.add_argument(
@@ -104,6 +275,23 @@ class Application:
             action="store_true",
             help="Show debug info",
         )
+        self.__arg_parser.add_argument(
+            "--market-data",
+            default=None,
+            type=str,
+            help="Shared memory market data file (published by supervisor market data feeder)",
+        )
+        self.__arg_parser.add_argument(
+            "--paper",
+            action="store_true",
+            help="Paper trading: simulated orders on live market data with virtual funds (paper_funds config)",
+        )
+        self.__arg_parser.add_argument(
+            "--paper-grid",
+            default=None,
+            type=str,
+            help='Paper trading bot arguments variants, each combination runs in parallel: "step=2,3;iters=5,10"',
+        )
         # self.__arg_parser.add_argument(
         #     "--pair",
         #     default="ltc_usd",
@@ -115,6 +303,52 @@ class Application:
         return str(self.__class__) + ": " + str(self.__dict__)
 
 
+class ArgumentParser(argparse.ArgumentParser):
+    """ Console arguments parser, also parses config "args" section """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config_args = False
+
+    def parse_config_args(self, argv: List[str], args: dict, log=None) -> Tuple[argparse.Namespace, List[str]]:
+        """
+        Parse config "args" section (as console arguments after `argv`), raise ConfigError instead of exit.
+        Unknown arguments are skipped (with warning).
+
+        :return: parsed arguments, names of the arguments from config
+        """
+        known = {action.dest for action in self._actions if action.default is not argparse.SUPPRESS}
+        argv = list(argv)
+        names = []
+        for name, value in args.items():
+            name = name.replace("-", "_")
+            if name not in known:
+                if log is not None:
+                    log.warning("Unknown argument in config: %s", name)
+                continue
+
+            option = "--{}".format(name.replace("_", "-"))
+            if isinstance(value, bool):
+                # flags (store_true)
+                if value:
+                    argv.append(option)
+            elif value is not None:
+                argv.append("{}={}".format(option, value))
+            names.append(name)
+
+        self.config_args = True
+        try:
+            return self.parse_args(argv), names
+        finally:
+            self.config_args = False
+
+    def error(self, message: str):
+        if self.config_args:
+            raise config.ConfigError("Config args: {}".format(message))
+
+        super().error(message)
+
+
 class RestartBotException(RuntimeError):
     """ Exception to restart loop with bot.run """
     def __init__(self, *args, timeout: int = 2, **kwargs):
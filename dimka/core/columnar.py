@@ -0,0 +1,283 @@
+import datetime
+import json
+import os
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy
+
+import dimka.core.models as models
+import dimka.core.utils as utils
+
+MANIFEST = "manifest.json"
+VERSION = 1
+
+# Column kinds
+FIXED = "fixed"
+TIMESTAMP = "timestamp"
+CATEGORY = "category"
+ID = "id"
+
+# Missing (NULL) value of fixed-point column
+NULL_FIXED = -2 ** 63
+
+DTYPES = {
+    FIXED: "<i8",
+    TIMESTAMP: "<M8[us]",
+    CATEGORY: "<i4",
+    ID: "<i8",
+}
+
+# (column name, kind, decimal digits)
+TICKER_COLUMNS = (
+    ("id", ID, 0),
+    ("pair", CATEGORY, 0),
+    ("high", FIXED, 10),
+    ("low", FIXED, 10),
+    ("avg", FIXED, 10),
+    ("last", FIXED, 10),
+    ("buy", FIXED, 10),
+    ("sell", FIXED, 10),
+    ("vol", FIXED, 5),
+    ("vol_cur", FIXED, 5),
+    ("updated", TIMESTAMP, 0),
+    ("updated_timestamp", TIMESTAMP, 0),
+)
+
+ORDER_INFO_COLUMNS = (
+    ("id", ID, 0),
+    ("pair", CATEGORY, 0),
+    ("order_type", CATEGORY, 0),
+    ("amount", FIXED, 10),
+    ("rate", FIXED, 10),
+    ("parent_order", ID, 0),
+    ("created", TIMESTAMP, 0),
+    ("created_timestamp", TIMESTAMP, 0),
+)
+
+
+class ColumnarStore(object):
+    """
+    Append-only columnar storage.
+
+    Each column is a raw little-endian NumPy file (<column>.bin) in the store directory,
+    decimals are kept as fixed-point int64 values (NULL_FIXED - missing value),
+    strings as int32 category codes.
+    The manifest holds the committed rows count, so data written after the last
+    committed append (interrupted export) is ignored and overwritten on the next append.
+    """
+
+    def __init__(self, path: str, columns: Tuple[Tuple[str, str, int], ...] = None):
+        self.path = path
+        self.manifest = self._read_manifest()
+        # category column name => {value: code}
+        self.codes = {}
+
+        if self.manifest is None:
+            if columns is None:
+                raise FileNotFoundError("Columnar store manifest not found: {}".format(self.path))
+
+            self.manifest = {
+                "version": VERSION,
+                "rows": 0,
+                "last_id": 0,
+                "columns": [
+                    {"name": name, "kind": kind, "digits": digits, "dtype": DTYPES[kind]}
+                    for name, kind, digits in columns
+                ],
+                "categories": {name: [] for name, kind, _ in columns if kind == CATEGORY},
+            }
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def last_id(self) -> int:
+        """ Last exported model id """
+        return self.manifest["last_id"]
+
+    @property
+    def column_names(self) -> List[str]:
+        return [c["name"] for c in self.manifest["columns"]]
+
+    def append(self, rows: Iterable[dict]) -> int:
+        """
+        Append rows (dicts: column name => value) to the store
+
+        :return: appended rows count
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        os.makedirs(self.path, exist_ok=True)
+        committed = self.manifest["rows"]
+        categories = self.manifest["categories"]
+
+        for column in self.manifest["columns"]:
+            values = self._encode(column, [row.get(column["name"]) for row in rows], categories)
+            data = numpy.asarray(values, dtype=column["dtype"])
+
+            with open(self._column_file(column["name"]), "ab+") as f:
+                # drop uncommitted tail left by interrupted append
+                f.truncate(committed * data.itemsize)
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.manifest["rows"] = committed + len(rows)
+        ids = [row.get("id") for row in rows if row.get("id") is not None]
+        if ids:
+            self.manifest["last_id"] = max(self.manifest["last_id"], max(ids))
+
+        self._write_manifest()
+
+        return len(rows)
+
+    def column(self, name: str) -> numpy.ndarray:
+        """ Memory-mapped (read only, zero-copy) column values """
+        column = self._column_info(name)
+        rows = self.manifest["rows"]
+
+        if rows == 0:
+            return numpy.empty(0, dtype=column["dtype"])
+
+        return numpy.memmap(self._column_file(name), dtype=column["dtype"], mode="r", shape=(rows,))
+
+    def columns(self) -> Dict[str, numpy.ndarray]:
+        return {name: self.column(name) for name in self.column_names}
+
+    def decimals(self, name: str) -> List[Union[None, Decimal]]:
+        """ Decode fixed-point column to Decimal values (None - missing value) """
+        column = self._column_info(name)
+        if column["kind"] != FIXED:
+            raise ValueError("Column {} is not fixed-point column".format(name))
+
+        return [
+            utils.from_fixed(value, column["digits"]) if value != NULL_FIXED else None
+            for value in self.column(name)
+        ]
+
+    def categories(self, name: str) -> List[str]:
+        """ Category column values (code is the index in the list) """
+        return list(self.manifest["categories"][name])
+
+    def strings(self, name: str) -> List[str]:
+        """ Decode category column to string values """
+        categories = self.categories(name)
+
+        return [categories[code] if code >= 0 else None for code in self.column(name)]
+
+    def _encode(self, column: dict, values: list, categories: Dict[str, list]) -> list:
+        kind = column["kind"]
+
+        if kind == FIXED:
+            return [utils.to_fixed(v, column["digits"]) if v is not None else NULL_FIXED for v in values]
+
+        if kind == TIMESTAMP:
+            return [_to_datetime64(v) for v in values]
+
+        if kind == CATEGORY:
+            known = categories[column["name"]]
+            index = self.codes.get(column["name"])
+            if index is None:
+                index = self.codes[column["name"]] = {value: code for code, value in enumerate(known)}
+
+            codes = []
+            for v in values:
+                if v is None:
+                    codes.append(-1)
+                    continue
+                if v not in index:
+                    index[v] = len(known)
+                    known.append(v)
+                codes.append(index[v])
+            return codes
+
+        # ID: missing reference stored as -1
+        return [int(v) if v is not None else -1 for v in values]
+
+    def _column_info(self, name: str) -> dict:
+        for column in self.manifest["columns"]:
+            if column["name"] == name:
+                return column
+
+        raise KeyError("Unknown column: {}".format(name))
+
+    def _column_file(self, name: str) -> str:
+        return os.path.join(self.path, "{}.bin".format(name))
+
+    def _read_manifest(self) -> Union[dict, None]:
+        file = os.path.join(self.path, MANIFEST)
+        if not os.path.isfile(file):
+            return None
+
+        with open(file, "r") as stream:
+            return json.load(stream)
+
+    def _write_manifest(self):
+        """ Atomically replace the manifest (commit point of append) """
+        file = os.path.join(self.path, MANIFEST)
+        tmp = "{}.tmp".format(file)
+
+        with open(tmp, "w") as stream:
+            json.dump(self.manifest, stream)
+            stream.flush()
+            os.fsync(stream.fileno())
+
+        os.replace(tmp, file)
+
+
+def _to_datetime64(value) -> numpy.datetime64:
+    if value is None:
+        return numpy.datetime64("NaT", "us")
+
+    if isinstance(value, (int, float, Decimal)):
+        value = datetime.datetime.utcfromtimestamp(float(value))
+
+    return numpy.datetime64(value, "us")
+
+
+def export_model(
+        path: str,
+        model: type,
+        columns: Tuple[Tuple[str, str, int], ...],
+        batch_size: int = 10000,
+) -> int:
+    """
+    Incrementally export model rows (only rows created after previous export)
+    to the columnar store
+
+    :return: exported rows count
+    """
+    store = ColumnarStore(path, columns)
+    fields = [getattr(model, name) for name, _, _ in columns]
+    names = [name for name, _, _ in columns]
+
+    query = (model
+             .select(*fields)
+             .where(model.id > store.last_id)
+             .order_by(model.id)
+             .tuples())
+
+    exported = 0
+    batch = []
+    for row in query.iterator():
+        batch.append(dict(zip(names, row)))
+        if len(batch) >= batch_size:
+            exported += store.append(batch)
+            batch = []
+
+    exported += store.append(batch)
+
+    return exported
+
+
+def export_tickers(path: str, batch_size: int = 10000) -> int:
+    """ Export Ticker history to the columnar store """
+    return export_model(path, models.Ticker, TICKER_COLUMNS, batch_size)
+
+
+def export_orders(path: str, batch_size: int = 10000) -> int:
+    """ Export OrderInfo history to the columnar store """
+    return export_model(path, models.OrderInfo, ORDER_INFO_COLUMNS, batch_size)
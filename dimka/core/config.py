@@ -1,13 +1,51 @@
 import os
 import yaml
 import errno
+import atexit
 import argparse
 import logging, verboselogs, coloredlogs
 
+from dimka.core import log
+from dimka.core.tracing import Tracer
+
+LOG_FORMAT = "%(asctime)s (%(name)s): %(message)s"
+
+# Config schema: parameter => (allowed types, required, hot reloadable)
+SCHEMA = {
+    "db_path": ((str,), True, True),
+    "db_storage": ((str,), False, False),
+    "db_snapshot_interval": ((int, float), False, False),
+    "key_path": ((str,), True, False),
+    "pair": ((str,), False, False),
+    "pair_units": ((int,), False, True),
+    "log_json_path": ((str,), False, False),
+    "journal_path": ((str,), False, False),
+    "trace_path": ((str,), False, False),
+    "market_data_max_age": ((int, float), False, True),
+    "api_retries": ((int,), False, True),
+    "api_deadline": ((int, float), False, True),
+    "api_backoff": ((int, float), False, True),
+    "api_hedge": ((bool,), False, True),
+    "api_hedge_min_samples": ((int,), False, True),
+    "breaker_threshold": ((int,), False, True),
+    "breaker_timeout": ((int, float), False, True),
+    "args": ((dict,), False, True),
+    "paper_funds": ((dict,), False, False),
+}
+
+
+class ConfigError(ValueError):
+    """ Invalid configuration """
+    pass
+
 
 class Config(object):
     params = {}
     log = None
+    log_listener = None
+    tracer = None
+    path = None
+    mtime = None
 
     def parse_config(self, args: argparse.Namespace) -> dict:
         """ Parse application config """
@@ -18,20 +56,125 @@ class Config(object):
                 args.config,
             )
 
-        with open(args.config, 'r') as stream:
-            self.params = (yaml.load(stream))
+        self.path = args.config
+        self.mtime = os.stat(self.path).st_mtime
+        self.params = self.load(self.path)
 
         return self.params
 
+    @staticmethod
+    def load(path: str) -> dict:
+        """ Load and validate config file """
+        with open(path, 'r') as stream:
+            params = yaml.safe_load(stream) or {}
+
+        Config.validate(params)
+
+        return params
+
+    @staticmethod
+    def validate(params: dict):
+        """ Validate config parameters against the schema """
+        if not isinstance(params, dict):
+            raise ConfigError("Config should be a mapping, got {}".format(type(params).__name__))
+
+        for name, (types, required, _) in SCHEMA.items():
+            if name not in params:
+                if required:
+                    raise ConfigError("Config parameter '{}' is required".format(name))
+                continue
+
+            # bool is int subclass, yaml "yes/no" shouldn't pass as number
+            value = params[name]
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                raise ConfigError("Config parameter '{}' should be {}, got {!r}".format(
+                    name,
+                    " or ".join(t.__name__ for t in types),
+                    value,
+                ))
+
+    def reload(self) -> dict:
+        """
+        Reload config file if it was changed (mtime polling).
+        Only hot reloadable parameters are applied (in place, so all holders
+        of params see new values), other changes require bot restart.
+
+        :return: applied changes: parameter => new value (None - removed)
+        """
+        if self.path is None:
+            return {}
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            self._log_warning("Config reload skipped: %s", e)
+            return {}
+
+        if mtime == self.mtime:
+            return {}
+
+        self.mtime = mtime
+
+        try:
+            params = self.load(self.path)
+        except (OSError, yaml.YAMLError, ConfigError) as e:
+            self._log_warning("Config reload rejected, keep current config: %s", e)
+            return {}
+
+        changes = {}
+        for name in set(params) | set(SCHEMA):
+            new = params.get(name)
+            if new == self.params.get(name):
+                continue
+
+            if name in SCHEMA and not SCHEMA[name][2]:
+                self._log_warning("Config parameter '%s' can't be changed without restart", name)
+                continue
+
+            changes[name] = new
+
+        for name, value in changes.items():
+            if value is None:
+                self.params.pop(name, None)
+            else:
+                self.params[name] = value
+
+        return changes
+
+    def _log_warning(self, msg: str, *args):
+        if self.log is not None:
+            self.log.warning(msg, *args)
+
     def init_logger(self, level: str, name: str) -> logging.Logger:
-        """ Init application logger """
+        """
+        Init application logger.
+        Records are passed through the queue to the listener thread,
+        so formatting and I/O don't block the bot thread.
+        """
         handler = logging.StreamHandler()
+        handler.setFormatter(coloredlogs.ColoredFormatter(LOG_FORMAT))
+        handlers = [handler]
 
-        handler.setFormatter(logging.Formatter("%(asctime)s (%(name)s): %(message)s"))
+        json_path = self.params.get("log_json_path")
+        if json_path:
+            json_handler = logging.FileHandler(json_path)
+            json_handler.setFormatter(log.JsonFormatter())
+            handlers.append(json_handler)
 
         self.log = verboselogs.VerboseLogger(name, level)
-        self.log.addHandler(handler)
-
-        coloredlogs.install(level=level, logger=self.log)
+        self.log_listener = log.start_listener(self.log, handlers)
+        atexit.register(self.stop_logger)
 
         return self.log
+
+    def init_tracer(self) -> Tracer:
+        """ Init cycles tracer (disabled if trace_path is not configured) """
+        self.tracer = Tracer(self.params.get("trace_path"))
+
+        return self.tracer
+
+    def stop_logger(self):
+        """ Flush queued log records and stop listener thread """
+        if self.log_listener is not None:
+            self.log_listener.stop()
+            self.log_listener = None
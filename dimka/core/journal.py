@@ -0,0 +1,125 @@
+import json
+import os
+from decimal import Decimal
+
+
+class StateJournal(object):
+    """
+    Append-only bot state journal.
+
+    Each record is a JSON line with the full (small) bot state,
+    it's flushed and fsynced before the bot makes the next step.
+    Last record is the current state, torn (partially written) tail is ignored and truncated.
+    Journal is compacted to the single record every `compact_every` records.
+
+    Without path journal is disabled: state is not kept (phase is always None),
+    so the bot doesn't resume.
+    """
+
+    def __init__(self, path: str = None, compact_every: int = 100):
+        self.path = path
+        self.compact_every = compact_every
+        self.records = 0
+        self.state = {}
+
+        if self.path is not None:
+            self.state = self.load()
+
+    def load(self) -> dict:
+        """
+        Replay journal and return last complete state.
+        Torn tail is truncated, so next records are appended after the last complete one.
+        """
+        state = {}
+        self.records = 0
+
+        if not os.path.isfile(self.path):
+            return state
+
+        offset = 0
+        with open(self.path, "rb") as stream:
+            for line in stream:
+                if not line.endswith(b"\n"):
+                    break
+
+                try:
+                    state = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    break
+
+                offset += len(line)
+                self.records += 1
+
+        if os.path.getsize(self.path) > offset:
+            with open(self.path, "r+b") as stream:
+                stream.truncate(offset)
+                stream.flush()
+                os.fsync(stream.fileno())
+
+        return state
+
+    def write(self, **state):
+        """ Write new bot state """
+        if self.path is None:
+            return
+
+        self.state = state
+
+        if self.records >= self.compact_every:
+            self.compact()
+            return
+
+        with open(self.path, "a") as stream:
+            stream.write(self._dumps(state))
+            stream.flush()
+            os.fsync(stream.fileno())
+
+        self.records += 1
+
+    def clear(self):
+        """ Reset state (bot is idle, nothing to resume) """
+        self.write()
+
+    def compact(self):
+        """ Rewrite journal with the current state only """
+        if self.path is None:
+            return
+
+        tmp = "{}.tmp".format(self.path)
+        with open(tmp, "w") as stream:
+            stream.write(self._dumps(self.state))
+            stream.flush()
+            os.fsync(stream.fileno())
+
+        os.replace(tmp, self.path)
+        self._fsync_dir()
+
+        self.records = 1
+
+    @property
+    def phase(self) -> str:
+        return self.state.get("phase")
+
+    def _fsync_dir(self):
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _dumps(state: dict) -> str:
+        return json.dumps(state, default=_encode) + "\n"
+
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return str(value)
+
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
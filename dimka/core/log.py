@@ -0,0 +1,69 @@
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+from decimal import Decimal
+from typing import List, Union
+
+from dimka.core.utils import td
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler which doesn't format records on the caller thread.
+    Message rendering (with all lazy arguments) happens in the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """ Structured log record formatter (one JSON object per line) """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(data)
+
+
+class LazyDecimal(object):
+    """
+    Lazy logger argument: truncate value and render it in fixed-point notation
+    only when the record is emitted.
+
+        logger.debug("Price: %s", LazyDecimal(price, 8))
+    """
+    __slots__ = ("value", "digits")
+
+    def __init__(self, value: Union[int, float, str, Decimal], digits: int):
+        self.value = value
+        self.digits = digits
+
+    def __str__(self):
+        return "{:f}".format(td(self.value, self.digits))
+
+
+def start_listener(logger: logging.Logger, handlers: List[logging.Handler]) -> logging.handlers.QueueListener:
+    """
+    Attach queue handler to the logger and start listener thread
+    which passes records to the given (I/O) handlers.
+    """
+    records = queue.SimpleQueue() if hasattr(queue, "SimpleQueue") else queue.Queue()
+
+    logger.addHandler(QueueHandler(records))
+
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+
+    return listener
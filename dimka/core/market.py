@@ -0,0 +1,211 @@
+import collections
+import mmap
+import os
+import struct
+import time
+from typing import List, Union
+
+from wexapi.common import WexConnection
+
+import dimka.core.utils as utils
+
+MAGIC = b"DIMKAMD1"
+SLOTS = 8
+DIGITS = 8
+PAIR_NAME_SIZE = 16
+
+# magic, slots per pair, pairs count
+HEADER = struct.Struct("<8sII")
+PAIR_NAME = struct.Struct("<{}s".format(PAIR_NAME_SIZE))
+# pair ring head: written slots counter
+HEAD = struct.Struct("<Q")
+# slot: sequence (odd while slot is written), timestamp, fixed-point values
+SEQ = struct.Struct("<Q")
+PAYLOAD = struct.Struct("<d12q")
+# fixed-point value of the empty depth side (no price)
+EMPTY = -2 ** 63
+
+FIELDS = (
+    "high", "low", "avg", "last", "buy", "sell", "vol", "vol_cur",
+    "ask_price", "ask_amount", "bid_price", "bid_amount",
+)
+
+MarketData = collections.namedtuple("MarketData", ("pair", "updated") + FIELDS)
+
+SLOT_SIZE = SEQ.size + PAYLOAD.size
+
+
+class MarketDataFile(object):
+    """
+    Shared memory (mmap file) market data.
+
+    Each pair has a ring buffer of slots, each slot is protected by the seqlock:
+    writer makes slot sequence odd, writes payload and makes sequence even again.
+    Reader copies slot and retries if sequence was odd or changed while copying.
+    Only one writer (market data feeder) is supported.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self._file = open(path, "r+b" if writable else "rb")
+        self._mmap = mmap.mmap(
+            self._file.fileno(),
+            0,
+            access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+        )
+
+        magic, self.slots, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not market data file".format(path))
+
+        self.offsets = {}
+        offset = HEADER.size
+        names = []
+        for _ in range(count):
+            names.append(PAIR_NAME.unpack_from(self._mmap, offset)[0].rstrip(b"\0").decode())
+            offset += PAIR_NAME.size
+
+        for name in names:
+            self.offsets[name] = offset
+            offset += self.pair_size(self.slots)
+
+    @property
+    def pairs(self) -> List[str]:
+        return list(self.offsets)
+
+    @staticmethod
+    def pair_size(slots: int) -> int:
+        return HEAD.size + SLOT_SIZE * slots
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+
+class MarketDataWriter(MarketDataFile):
+    def __init__(self, path: str):
+        super().__init__(path, writable=True)
+
+    @classmethod
+    def create(cls, path: str, pairs: List[str], slots: int = SLOTS) -> "MarketDataWriter":
+        """ Create (replace) market data file """
+        size = HEADER.size + PAIR_NAME.size * len(pairs) + cls.pair_size(slots) * len(pairs)
+
+        tmp = "{}.tmp".format(path)
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, slots, len(pairs)))
+            for pair in pairs:
+                f.write(PAIR_NAME.pack(pair.encode()))
+            f.truncate(size)
+
+        os.replace(tmp, path)
+
+        return cls(path)
+
+    def publish(self, pair: str, ticker, asks: list, bids: list, updated: float = None):
+        """
+        Publish pair market data
+
+        :param ticker: object with ticker attributes (wexapi.models.Ticker) or dict
+        :param asks: depth asks [[price, amount], ...]
+        :param bids: depth bids [[price, amount], ...]
+        :param updated: data timestamp (default - now)
+        """
+        get = ticker.get if isinstance(ticker, dict) else lambda name: getattr(ticker, name)
+        values = [utils.to_fixed(get(name), DIGITS) for name in FIELDS[:8]]
+        for side in (asks, bids):
+            if side:
+                values.extend(utils.to_fixed(value, DIGITS) for value in side[0][:2])
+            else:
+                values.extend((EMPTY, EMPTY))
+
+        payload = PAYLOAD.pack(updated if updated is not None else time.time(), *values)
+
+        offset = self.offsets[pair]
+        head = HEAD.unpack_from(self._mmap, offset)[0]
+        slot = offset + HEAD.size + SLOT_SIZE * (head % self.slots)
+
+        # next even (complete) sequence, odd one is left by the writer killed during the write
+        seq = (SEQ.unpack_from(self._mmap, slot)[0] | 1) + 1
+        SEQ.pack_into(self._mmap, slot, seq - 1)
+        self._mmap[slot + SEQ.size:slot + SLOT_SIZE] = payload
+        SEQ.pack_into(self._mmap, slot, seq)
+
+        HEAD.pack_into(self._mmap, offset, head + 1)
+
+
+class MarketDataReader(MarketDataFile):
+    def __init__(self, path: str):
+        super().__init__(path, writable=False)
+
+    def latest(self, pair: str, retries: int = 100) -> Union[None, MarketData]:
+        """
+        Latest published pair market data (None if there is no data).
+        Price and amount of the empty depth side are None.
+        """
+        offset = self.offsets.get(pair)
+        if offset is None:
+            return None
+
+        for _ in range(retries):
+            head = HEAD.unpack_from(self._mmap, offset)[0]
+            if head == 0:
+                return None
+
+            slot = offset + HEAD.size + SLOT_SIZE * ((head - 1) % self.slots)
+
+            seq = SEQ.unpack_from(self._mmap, slot)[0]
+            if seq & 1:
+                continue
+
+            payload = self._mmap[slot + SEQ.size:slot + SLOT_SIZE]
+            if SEQ.unpack_from(self._mmap, slot)[0] != seq:
+                continue
+
+            updated, *values = PAYLOAD.unpack(payload)
+
+            return MarketData(pair, updated, *[
+                None if value == EMPTY else utils.from_fixed(value, DIGITS) for value in values
+            ])
+
+        return None
+
+    def fresh(self, pair: str, max_age: float) -> Union[None, MarketData]:
+        """ Latest pair market data if it's not older than max_age seconds """
+        data = self.latest(pair)
+        if data is None or time.time() - data.updated > max_age:
+            return None
+
+        return data
+
+
+def run_feeder(path: str, pairs: List[str], interval: float = 1.0, log=None):
+    """
+    Market data feeder loop: fetch tickers and top of the depth for all pairs
+    (one request for all pairs) and publish them to the market data file.
+    """
+    writer = MarketDataWriter(path)
+    names = "-".join(pairs)
+
+    while True:
+        started = time.time()
+        try:
+            with WexConnection() as conn:
+                tickers = conn.make_json_request("/api/3/ticker/{}".format(names))
+                depth = conn.make_json_request("/api/3/depth/{}?limit=1".format(names))
+
+            for pair in pairs:
+                if pair in tickers and pair in depth:
+                    writer.publish(pair, tickers[pair], depth[pair]["asks"], depth[pair]["bids"])
+        except Exception as e:
+            if log is not None:
+                log.warning("Market data feeder error: %s", e)
+
+        time.sleep(max(0.0, interval - (time.time() - started)))
+
@@ -0,0 +1,270 @@
+import collections
+import functools
+import http.client
+import queue
+import threading
+import time
+from typing import Callable, Union
+
+from dimka.core.app import RestartBotException
+
+# Network errors: request can be repeated
+TRANSIENT_ERRORS = (OSError, http.client.HTTPException)
+# Min request timeout (seconds) when the call deadline is almost over
+MIN_TIMEOUT = 1.0
+
+
+class CircuitOpenError(RestartBotException):
+    """
+    Endpoint circuit is open: exchange is degraded, fail fast.
+    Bot cycle is restarted after the circuit open time left (exception timeout).
+    """
+    pass
+
+
+class LatencyTracker(object):
+    """ Sliding window of call durations """
+
+    def __init__(self, size: int = 100):
+        self.durations = collections.deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, duration: float):
+        with self.lock:
+            self.durations.append(duration)
+
+    def percentile(self, pct: float) -> Union[None, float]:
+        with self.lock:
+            durations = sorted(self.durations)
+
+        if not durations:
+            return None
+
+        index = min(len(durations) - 1, int(round(pct / 100 * (len(durations) - 1))))
+
+        return durations[index]
+
+
+class CircuitBreaker(object):
+    """
+    Per endpoint circuit breaker.
+
+    After `threshold` consecutive failures circuit is open for `timeout` seconds
+    and calls fail immediately. After timeout one trial call is allowed (half-open):
+    success closes circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, threshold: int = 5, timeout: float = 30):
+        self.name = name
+        self.threshold = threshold
+        self.timeout = timeout
+        self.failures = 0
+        self.opened = None
+
+    def check(self):
+        """ Raise CircuitOpenError if circuit is open """
+        if self.opened is None:
+            return
+
+        left = self.opened + self.timeout - time.monotonic()
+        if left > 0:
+            raise CircuitOpenError(
+                "{} circuit is open, exchange is degraded".format(self.name),
+                timeout=int(left) + 1,
+            )
+
+    def success(self):
+        self.failures = 0
+        self.opened = None
+
+    def failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened = time.monotonic()
+
+
+class Resilience(object):
+    """
+    Retries, hedged requests and circuit breakers for exchange calls.
+
+    Config parameters (all optional):
+        api_retries: attempts count for failed call (default 3)
+        api_deadline: max seconds for call with all retries, each request timeout
+                      is bounded by the time left (default 20)
+        api_backoff: first retry delay, doubled for each next retry (default 0.5)
+        api_hedge: send hedged request for public reads (default true)
+        api_hedge_min_samples: latency samples required to hedge (default 20)
+        breaker_threshold: consecutive failures to open circuit (default 5)
+        breaker_timeout: seconds circuit stays open (default 30)
+    """
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.breakers = {}
+        self.latency = collections.defaultdict(LatencyTracker)
+        self.local = threading.local()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self.breakers:
+            self.breakers[endpoint] = CircuitBreaker(
+                endpoint,
+                int(self.params.get("breaker_threshold", 5)),
+                float(self.params.get("breaker_timeout", 30)),
+            )
+
+        return self.breakers[endpoint]
+
+    def timeout(self, default: float = 30) -> float:
+        """ Request timeout of the current call attempt (time left to the call deadline) """
+        return getattr(self.local, "timeout", None) or default
+
+    def call(
+            self,
+            endpoint: str,
+            fn: Callable,
+            hedge: bool = False,
+            reconcile: Callable = None,
+    ):
+        """
+        Call exchange endpoint
+
+        :param endpoint: endpoint name (circuit breaker and latency stats key)
+        :param fn: call without arguments
+        :param hedge: call is idempotent and can be sent twice in parallel (public reads)
+        :param reconcile: before retry check if failed call was actually executed by the exchange,
+                          returns call result or None (not executed)
+        """
+        breaker = self.breaker(endpoint)
+        breaker.check()
+
+        attempts = int(self.params.get("api_retries", 3))
+        deadline = time.monotonic() + float(self.params.get("api_deadline", 20))
+        delay = float(self.params.get("api_backoff", 0.5))
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                if attempt > 1 and reconcile is not None:
+                    result = reconcile()
+                    if result is not None:
+                        breaker.success()
+                        return result
+
+                timeout = max(MIN_TIMEOUT, deadline - time.monotonic())
+                if hedge and self.params.get("api_hedge", True):
+                    result = self._hedged(endpoint, fn, timeout)
+                else:
+                    result = self._timed(endpoint, fn, timeout)
+
+                breaker.success()
+
+                return result
+            except TRANSIENT_ERRORS:
+                breaker.failure()
+
+                if attempt >= attempts or time.monotonic() + delay > deadline or breaker.opened is not None:
+                    raise
+
+                time.sleep(delay)
+                delay *= 2
+
+    def _timed(self, endpoint: str, fn: Callable, timeout: float):
+        self.local.timeout = timeout
+        started = time.monotonic()
+        try:
+            result = fn()
+        finally:
+            self.local.timeout = None
+        self.latency[endpoint].add(time.monotonic() - started)
+
+        return result
+
+    def _hedged(self, endpoint: str, fn: Callable, timeout: float):
+        """
+        Send second request if the first one is slower than p95 latency,
+        return the first completed result.
+        Requests run in daemon threads: hung request doesn't block the process exit.
+        """
+        tracker = self.latency[endpoint]
+        p95 = None
+        if len(tracker.durations) >= int(self.params.get("api_hedge_min_samples", 20)):
+            p95 = tracker.percentile(95)
+
+        if p95 is None:
+            return self._timed(endpoint, fn, timeout)
+
+        results = queue.Queue()
+
+        def request():
+            try:
+                results.put((True, self._timed(endpoint, fn, timeout)))
+            except Exception as e:
+                results.put((False, e))
+
+        pending = 1
+        threading.Thread(target=request, name="hedge", daemon=True).start()
+        try:
+            outcome = results.get(timeout=p95)
+        except queue.Empty:
+            pending += 1
+            threading.Thread(target=request, name="hedge", daemon=True).start()
+            outcome = results.get()
+
+        while True:
+            pending -= 1
+            ok, value = outcome
+            if ok:
+                return value
+            if pending == 0 or not isinstance(value, TRANSIENT_ERRORS):
+                raise value
+
+            outcome = results.get()
+
+
+def public_read(endpoint: str):
+    """ Bot method decorator: idempotent public read (retry + hedged request) """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return self.resilience.call(endpoint, lambda: method(self, *args, **kwargs), hedge=True)
+        return wrapper
+    return decorator
+
+
+def private_read(endpoint: str):
+    """
+    Bot method decorator: idempotent private read (retry).
+    Private requests are not hedged, parallel requests break nonce order.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return self.resilience.call(endpoint, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def trade_call(endpoint: str, reconcile: str, snapshot: str = None):
+    """
+    Bot method decorator: trade call (retry after reconciliation)
+
+    :param reconcile: bot method name, called with the same arguments as decorated method
+                      before retry. Returns result if the failed call was executed by the exchange.
+    :param snapshot: bot method name, called with the same arguments before the first attempt.
+                     Its result (state known before the call) is passed to reconcile as the first argument.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            reconcile_args = args
+            if snapshot is not None:
+                reconcile_args = (getattr(self, snapshot)(*args, **kwargs),) + args
+
+            return self.resilience.call(
+                endpoint,
+                lambda: method(self, *args, **kwargs),
+                reconcile=lambda: getattr(self, reconcile)(*reconcile_args, **kwargs),
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import threading
+import time
+
+from peewee import SqliteDatabase
+
+# Database pages copied per snapshot step, bot threads can use the database between the steps
+SNAPSHOT_PAGES = 100
+# SQLite online backup API (Python 3.7+), SQL dump copy is used without it
+BACKUP_API = hasattr(sqlite3.Connection, "backup")
+
+
+class MemoryStorage(object):
+    """
+    In-memory SQLite database with snapshots to the database file.
+
+    On open existing database file is loaded to the memory, snapshots are made
+    (SQLite online backup API, `pages` per step; SQL dump on Python 3.6)
+    by the background thread every `interval` seconds
+    and on close. Snapshot is written to the temporary file and atomically replaces
+    the database file (directory is fsynced), so the file is always consistent.
+    Data written after the last snapshot (at most `interval` seconds) is lost on crash.
+
+    In-memory database exists only in the connection of the thread which opened it.
+    """
+
+    def __init__(
+            self,
+            database: SqliteDatabase,
+            path: str,
+            interval: float = 60,
+            log=None,
+            pages: int = SNAPSHOT_PAGES,
+    ):
+        self.database = database
+        self.log = log
+        self.path = path
+        self.interval = interval
+        self.pages = pages
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.conn = None
+        self.snapshot_time = None
+
+    def open(self) -> bool:
+        """
+        Open in-memory database and load database file
+
+        :return: True if database file was loaded, False - new database
+        """
+        self.database.init(":memory:", check_same_thread=False)
+        self.conn = self.database.connection()
+
+        loaded = os.path.isfile(self.path)
+        if loaded:
+            source = sqlite3.connect(self.path)
+            try:
+                copy_database(source, self.conn)
+            finally:
+                source.close()
+
+        self.snapshot_time = time.time()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="db-snapshot", daemon=True)
+        self.thread.start()
+
+        return loaded
+
+    def snapshot(self):
+        """ Copy in-memory database to the database file """
+        with self.lock:
+            if self.conn is None:
+                return
+
+            tmp = "{}.tmp".format(self.path)
+            if os.path.isfile(tmp):
+                # left by the failed snapshot (SQL dump needs empty database)
+                os.remove(tmp)
+
+            target = sqlite3.connect(tmp)
+            try:
+                copy_database(self.conn, target, self.pages)
+            finally:
+                target.close()
+
+            os.replace(tmp, self.path)
+            self._fsync_dir()
+            self.snapshot_time = time.time()
+
+    def close(self):
+        """ Stop snapshots thread, make final snapshot and close database """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        self.snapshot()
+
+        with self.lock:
+            self.conn = None
+            if not self.database.is_closed():
+                self.database.close()
+
+    def _fsync_dir(self):
+        """ Persist the database file replace """
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception as e:
+                if self.log is not None:
+                    self.log.error("Database snapshot failed: %s", e)
+
+
+def copy_database(source: sqlite3.Connection, target: sqlite3.Connection, pages: int = -1):
+    """ Copy database by online backup API (`pages` per step) or SQL dump (Python 3.6) """
+    if BACKUP_API:
+        source.backup(target, pages=pages)
+        return
+
+    target.executescript("\n".join(source.iterdump()))
@@ -0,0 +1,117 @@
+import logging
+import multiprocessing
+import signal
+import subprocess
+import sys
+import time
+from typing import List
+
+from dimka.core import config, market
+
+
+class Supervisor(object):
+    """
+    Run many bot instances (worker processes) and single market data feeder process.
+    Feeder publishes market data of all bot pairs to the shared memory file,
+    bots read it from there instead of the public API requests.
+
+    Supervisor config (yaml):
+
+        market_data_path: /var/www/data/market.mmap
+        market_data_interval: 1
+        bots:
+          - script: 3-step-bot.py
+            config: /var/www/conf/bot1.yaml
+            args: ["--step=3", "--iters=10"]
+    """
+
+    def __init__(self, params: dict, log: logging.Logger):
+        self.params = params
+        self.log = log
+        self.feeder = None
+        self.workers = {}
+
+    def run(self):
+        bots = self.params.get("bots") or []
+        path = self.params.get("market_data_path")
+        pairs = self.pairs(bots)
+
+        self.log.notice("Market data: %s, pairs: %s", path, ", ".join(pairs))
+        market.MarketDataWriter.create(path, pairs).close()
+
+        # "docker stop": stop workers and feeder (finally block) instead of leaving them orphaned
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+        try:
+            while True:
+                if self.feeder is None or not self.feeder.is_alive():
+                    self.start_feeder(path, pairs)
+
+                for i, bot in enumerate(bots):
+                    worker = self.workers.get(i)
+                    if worker is None or worker.poll() is not None:
+                        self.workers[i] = self.start_worker(bot, path)
+
+                time.sleep(self.params.get("check_interval", 5))
+        finally:
+            self.stop()
+
+    def start_feeder(self, path: str, pairs: List[str]):
+        if self.feeder is not None:
+            self.log.warning("Market data feeder exited with code: %s", self.feeder.exitcode)
+
+        self.feeder = multiprocessing.Process(
+            target=self.run_feeder,
+            args=(path, pairs, self.params.get("market_data_interval", 1), self.log.level),
+            name="market-data-feeder",
+            daemon=True,
+        )
+        self.feeder.start()
+        self.log.notice("Started market data feeder: pid %s", self.feeder.pid)
+
+    @staticmethod
+    def run_feeder(path: str, pairs: List[str], interval: float, level: int):
+        """
+        Feeder process: market data feeder loop with its own logger
+        (listener thread of the supervisor logger doesn't exist in the child process)
+        """
+        log = config.Config().init_logger(level, "market-data-feeder")
+        market.run_feeder(path, pairs, interval, log)
+
+    def start_worker(self, bot: dict, path: str) -> subprocess.Popen:
+        cmd = [sys.executable, bot.get("script"), bot.get("config")]
+        cmd.extend(bot.get("args") or [])
+        cmd.extend(["--market-data", path])
+
+        worker = subprocess.Popen(cmd)
+        self.log.notice("Started bot %s: pid %s", bot.get("config"), worker.pid)
+
+        return worker
+
+    def stop(self):
+        """ Stop workers and feeder """
+        for worker in self.workers.values():
+            if worker.poll() is None:
+                worker.terminate()
+
+        for worker in self.workers.values():
+            try:
+                worker.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+
+        if self.feeder is not None and self.feeder.is_alive():
+            self.feeder.terminate()
+            self.feeder.join()
+
+    @staticmethod
+    def pairs(bots: List[dict]) -> List[str]:
+        """ Unique pairs from bot configs """
+        pairs = []
+        for bot in bots:
+            pair = config.Config.load(bot.get("config")).get("pair")
+            if pair and pair not in pairs:
+                pairs.append(pair)
+
+        return pairs
+
@@ -0,0 +1,410 @@
+import collections
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, List
+
+SERVICE = "dimka"
+
+# Span categories (cycle phases)
+NETWORK = "network"
+DB = "db"
+SLEEP = "sleep"
+# time of the log calls on the bot thread (cycle span attribute, not a span)
+LOG = "log"
+
+# Logger methods accounted by TracedLogger
+LOG_METHODS = frozenset((
+    "spam", "debug", "verbose", "info", "notice", "warning", "success", "error", "exception", "critical", "log",
+))
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span(object):
+    """ Trace span, also context manager which opens/closes it """
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "error")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = None
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = None
+        self.start = None
+        self.end = None
+        self.error = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.tracer.start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.error = "{}: {}".format(exc_type.__name__, exc)
+
+        self.tracer.finish(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+
+        return span
+
+
+class NullSpan(object):
+    """ Span of the disabled tracer """
+
+    def set(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer(object):
+    """
+    Span-based tracer.
+
+    Spans are nested per thread, root span (bot cycle) is exported with all its
+    child spans as one line of OpenTelemetry (OTLP) JSON to the trace file.
+    Without path tracer is disabled and spans cost nothing.
+    """
+
+    def __init__(self, path: str = None, service: str = SERVICE):
+        self.path = path
+        self.service = service
+        self.local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            return NULL_SPAN
+
+        return Span(self, name, attributes)
+
+    def sleep(self, seconds: float):
+        """ time.sleep in the span """
+        with self.span("sleep", category=SLEEP, seconds=seconds):
+            time.sleep(seconds)
+
+    def logged(self, seconds: float):
+        """
+        Account log call time to the cycle (root span "log_time" attribute).
+        Log calls inside categorized spans are already accounted by their category.
+        """
+        stack = self._stack()
+        if not stack or any(span.attributes.get("category") for span in stack):
+            return
+
+        root = stack[0]
+        root.attributes["log_time"] = root.attributes.get("log_time", 0.0) + seconds
+
+    def start(self, span: Span):
+        stack = self._stack()
+        if stack:
+            span.trace_id = stack[-1].trace_id
+            span.parent_id = stack[-1].span_id
+        else:
+            span.trace_id = os.urandom(16).hex()
+            self.local.finished = []
+
+        span.start = _now()
+        stack.append(span)
+
+    def finish(self, span: Span):
+        span.end = _now()
+
+        stack = self._stack()
+        stack.pop()
+        self.local.finished.append(span)
+
+        if not stack:
+            self.export(self.local.finished)
+            self.local.finished = []
+
+    def export(self, spans: List[Span]):
+        data = {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": self.service}}],
+                },
+                "scopeSpans": [{
+                    "scope": {"name": SERVICE},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }],
+        }
+
+        with open(self.path, "a") as stream:
+            stream.write(json.dumps(data) + "\n")
+
+    def _stack(self) -> list:
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+
+        return self.local.stack
+
+
+class TracedLogger(object):
+    """
+    Logger proxy: time of the log calls (record creation and queue handler on the bot thread)
+    is accounted to the cycle LOG phase.
+    """
+
+    def __init__(self, logger, tracer: Tracer):
+        self.logger = logger
+        self.tracer = tracer
+
+    def __getattr__(self, name):
+        attr = getattr(self.logger, name)
+        if name not in LOG_METHODS:
+            return attr
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                self.tracer.logged(time.perf_counter() - started)
+
+        return call
+
+
+def traced(name: str, category: str = NETWORK):
+    """
+    Bot method decorator: call in the span.
+    Span attributes: bot pair, simple method arguments and result order_id.
+    Spans without category are accounted by their child spans in summary phases.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.tracer.enabled:
+                return method(self, *args, **kwargs)
+
+            attributes = {"pair": self.pair}
+            if category is not None:
+                attributes["category"] = category
+            bound = signature.bind(self, *args, **kwargs)
+            for arg, value in list(bound.arguments.items())[1:]:
+                if isinstance(value, (str, int, float, bool, Decimal)):
+                    attributes[arg] = value
+
+            with self.tracer.span(name, **attributes) as span:
+                result = method(self, *args, **kwargs)
+
+                order_id = getattr(result, "order_id", None)
+                if order_id is not None:
+                    span.set("order_id", order_id)
+
+                return result
+
+        return wrapper
+    return decorator
+
+
+def _now() -> int:
+    return int(time.time() * 1e9)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+
+    return {"stringValue": str(value)}
+
+
+def _from_otlp_value(value: dict):
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "doubleValue" in value:
+        return value["doubleValue"]
+    if "boolValue" in value:
+        return value["boolValue"]
+
+    return value.get("stringValue")
+
+
+def read_traces(path: str) -> List[List[dict]]:
+    """
+    Read exported traces
+
+    :return: list of traces, trace is the list of spans:
+             dict(name, span_id, parent_id, start, end (seconds), attributes)
+    """
+    traces = []
+    with open(path, "r") as stream:
+        for line in stream:
+            if not line.strip():
+                continue
+
+            spans = []
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    for span in scope["spans"]:
+                        spans.append({
+                            "name": span["name"],
+                            "span_id": span["spanId"],
+                            "parent_id": span.get("parentSpanId"),
+                            "start": int(span["startTimeUnixNano"]) / 1e9,
+                            "end": int(span["endTimeUnixNano"]) / 1e9,
+                            "attributes": {a["key"]: _from_otlp_value(a["value"]) for a in span["attributes"]},
+                        })
+            traces.append(spans)
+
+    return traces
+
+
+def summarize(traces: List[List[dict]]) -> dict:
+    """
+    Summary over many cycles:
+        - cycles: cycles count and duration percentiles
+        - phases: time spent in network/db/sleep, log calls and other (bot code)
+        - spans: per span name count and duration percentiles
+        - tick_to_order: time from the end of top price request to the end of order creation
+        - critical_path: slowest cycle, descending to the longest child span on each level
+    """
+    cycles = []
+    phases = collections.Counter()
+    spans = collections.defaultdict(list)
+    tick_to_order = []
+    slowest = None
+
+    for trace in traces:
+        roots = [s for s in trace if not s["parent_id"]]
+        if not roots:
+            continue
+
+        root = roots[0]
+        duration = root["end"] - root["start"]
+        cycles.append(duration)
+        if slowest is None or duration > slowest[0]:
+            slowest = (duration, trace, root)
+
+        children = collections.defaultdict(list)
+        for span in trace:
+            spans[span["name"]].append(span["end"] - span["start"])
+            if span["parent_id"]:
+                children[span["parent_id"]].append(span)
+
+        # outermost categorized spans, uncategorized spans (bot steps) are descended
+        categorized = 0.0
+        pending = list(children[root["span_id"]])
+        while pending:
+            span = pending.pop()
+            category = span["attributes"].get("category")
+            if category is None:
+                pending.extend(children[span["span_id"]])
+                continue
+
+            phases[category] += span["end"] - span["start"]
+            categorized += span["end"] - span["start"]
+
+        logged = root["attributes"].get("log_time", 0.0)
+        if logged:
+            phases[LOG] += logged
+        phases["other"] += max(0.0, duration - categorized - logged)
+
+        tick = None
+        for span in sorted(trace, key=lambda s: s["start"]):
+            if span["name"] in ("top_sell_price", "top_buy_price"):
+                tick = span["end"]
+            elif span["name"] in ("create_buy_order", "create_sell_order") and tick is not None:
+                tick_to_order.append(span["end"] - tick)
+                tick = None
+
+    critical_path = []
+    if slowest is not None:
+        _, trace, span = slowest
+        children = collections.defaultdict(list)
+        for s in trace:
+            children[s["parent_id"]].append(s)
+
+        while span is not None:
+            critical_path.append((span["name"], span["end"] - span["start"]))
+            nested = children.get(span["span_id"])
+            span = max(nested, key=lambda s: s["end"] - s["start"]) if nested else None
+
+    total = sum(cycles)
+
+    return {
+        "cycles": _stats(cycles),
+        "phases": {name: (value, value / total if total else 0.0) for name, value in phases.most_common()},
+        "spans": {name: _stats(durations) for name, durations in sorted(spans.items())},
+        "tick_to_order": _stats(tick_to_order),
+        "critical_path": critical_path,
+    }
+
+
+def format_summary(summary: dict) -> str:
+    lines = []
+
+    def stats(name: str, s: Dict[str, float]):
+        return "  {:<28} count:{:>6}  p50:{:>9.4f}s  p95:{:>9.4f}s  max:{:>9.4f}s".format(
+            name, s["count"], s["p50"], s["p95"], s["max"],
+        )
+
+    lines.append("Cycles:")
+    lines.append(stats("cycle", summary["cycles"]))
+    lines.append(stats("tick to order", summary["tick_to_order"]))
+
+    lines.append("Phases:")
+    for name, (seconds, share) in summary["phases"].items():
+        lines.append("  {:<28} {:>10.3f}s  {:>6.1%}".format(name, seconds, share))
+
+    lines.append("Spans:")
+    for name, s in summary["spans"].items():
+        lines.append(stats(name, s))
+
+    lines.append("Critical path (slowest cycle):")
+    for depth, (name, seconds) in enumerate(summary["critical_path"]):
+        lines.append("  {}{} {:.4f}s".format("  " * depth, name, seconds))
+
+    return "\n".join(lines)
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+    values = sorted(values)
+
+    def pct(p):
+        return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+    return {"count": len(values), "p50": pct(50), "p95": pct(95), "max": values[-1]}
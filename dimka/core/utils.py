@@ -20,3 +20,17 @@ def td(value: Union[int, float, str, Decimal], digits: int, rounding=ROUND_HALF_
     Alias for truncate_digits
     """
     return truncate_digits(value, digits, rounding=rounding)
+
+
+def to_fixed(value: Union[int, float, str, Decimal], digits: int) -> int:
+    """
+    Convert value to the fixed-point integer with given decimal digits
+    """
+    return int(truncate_digits(value, digits).scaleb(min(digits, 15)))
+
+
+def from_fixed(value: int, digits: int) -> Decimal:
+    """
+    Convert fixed-point integer (see to_fixed) back to Decimal
+    """
+    return Decimal(int(value)).scaleb(-min(digits, 15))
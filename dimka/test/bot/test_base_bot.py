@@ -9,6 +9,7 @@ import os
 from wexapi.keyhandler import KeyHandler
 import dimka.bot.base_bot as base_bot
 import dimka.core as core
+from dimka.core.market import MarketDataWriter
 
 FIXTURE_DIR = Path(__file__).parent.resolve() / "fixtures"
 
@@ -67,6 +68,35 @@ class TestBaseBot(unittest.TestCase):
     def test_low_high_daily_prices(self):
         self.assertEqual(self.bot.low_high_daily_prices(), (Decimal('1.64'), Decimal('1.76')))
 
+    def test_shared_market_data(self):
+        path = "/tmp/market.tmp"
+        writer = MarketDataWriter.create(path, ["ppc_usd"])
+        writer.publish(
+            "ppc_usd",
+            {"high": 1.76, "low": 1.64, "avg": 1.7, "last": 1.671, "buy": 1.693, "sell": 1.671, "vol": 1, "vol_cur": 1},
+            [[1.68, 1]],
+            [[1.67, 1]],
+        )
+
+        args = self.bot.args
+        self.bot.args = Namespace(step=3, market_data=path)
+        samples = self._latency_samples()
+        try:
+            self.assertEqual(self.bot.top_sell_price(), Decimal("1.68"))
+            self.assertEqual(self.bot.top_buy_price(), Decimal("1.67"))
+            self.assertEqual(self.bot.low_high_daily_prices(), (Decimal('1.64'), Decimal('1.76')))
+            # shared memory reads are not accounted in the API latency (hedging)
+            self.assertEqual(self._latency_samples(), samples)
+        finally:
+            self.bot.args = args
+            self.bot.market.close()
+            self.bot.market = None
+            writer.close()
+            os.remove(path)
+
+    def _latency_samples(self):
+        return {name: len(self.bot.resilience.latency[name].durations) for name in ("ticker", "depth")}
+
 
 if __name__ == '__main__':
     unittest.main()
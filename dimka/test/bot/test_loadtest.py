@@ -0,0 +1,108 @@
+import logging
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import verboselogs
+
+import dimka.bot.loadtest as loadtest
+from dimka.bot.three import bot as three
+from dimka.core.config import Config
+from dimka.core.tracing import NETWORK, DB
+
+
+def result(accounts, throughput, p95, phases=None, cpu=0.1, errors=None):
+    return {
+        "accounts": accounts,
+        "throughput": throughput,
+        "cycle": {"count": 1, "p50": p95, "p95": p95, "max": p95},
+        "phases": phases or {NETWORK: 0.1},
+        "cpu": cpu,
+        "errors": errors or {},
+    }
+
+
+class TestLoadTest(unittest.TestCase):
+    db = os.path.join(tempfile.gettempdir(), "load-test-test.sqlite3")
+
+    def tearDown(self):
+        if os.path.isfile(self.db):
+            os.remove(self.db)
+
+    def test_synthetic_market_depth(self):
+        market = loadtest.SyntheticMarket()
+        asks, bids = market.depth("ppc_usd", 5)
+
+        self.assertEqual(len(asks), 5)
+        self.assertGreater(asks[0].price, bids[0].price)
+        self.assertEqual([a.price for a in asks], sorted(a.price for a in asks))
+        self.assertEqual([b.price for b in bids], sorted((b.price for b in bids), reverse=True))
+
+    def test_latency_exchange_delegates(self):
+        exchange = MagicMock()
+        exchange.funds.return_value = {"usd": 1}
+
+        wrapped = loadtest.LatencyExchange(exchange, latency=0)
+
+        self.assertEqual(wrapped.funds(), {"usd": 1})
+        exchange.funds.assert_called_once_with()
+
+    def test_capacity(self):
+        results = [
+            result(1, 1.0, 0.5),
+            result(10, 10.0, 0.6),
+            result(100, 40.0, 2.0, phases={NETWORK: 0.1, DB: 1.5}),
+        ]
+
+        analysis = loadtest.capacity(results)
+
+        self.assertEqual(analysis["capacity"], 10)
+        self.assertEqual(analysis["degraded"], 100)
+        self.assertEqual(analysis["bottleneck"], "SQLite")
+
+    def test_bottleneck(self):
+        base = result(1, 1.0, 0.5)
+
+        self.assertEqual(
+            loadtest.bottleneck(base, result(50, 5.0, 3.0, errors={"OperationalError: database is locked": 3})),
+            "SQLite locks",
+        )
+        self.assertEqual(loadtest.bottleneck(base, result(50, 5.0, 3.0, cpu=0.97)), "CPU / GIL")
+        self.assertEqual(loadtest.bottleneck(base, result(50, 5.0, 3.0, phases={NETWORK: 0.5})), "exchange calls")
+
+    def test_no_bottleneck_when_phases_shrank(self):
+        base = result(1, 1.0, 0.5, phases={NETWORK: 0.1, DB: 0.02})
+
+        self.assertEqual(loadtest.bottleneck(base, result(10, 10.0, 0.4, phases={NETWORK: 0.08, DB: 0.01})), "none")
+
+    def test_bot_args(self):
+        config = Config()
+        config.params = {"pair": "ppc_usd", "args": {"step": "2", "iters-time": 1}}
+        config.log = MagicMock()
+
+        args = loadtest.LoadTest(config, "three", self.db).bot_args(three)
+
+        self.assertEqual(args.step, 2)
+        self.assertEqual(args.iters_time, 1)
+        self.assertEqual(args.iters, 5)
+        self.assertIsNone(args.market_data)
+
+    def test_run(self):
+        config = Config()
+        config.params = {"pair": "ppc_usd", "pair_units": 8}
+        config.log = verboselogs.VerboseLogger("load-test", logging.CRITICAL)
+
+        test = loadtest.LoadTest(config, "three", self.db, duration=0.5, warmup=0.1, time_scale=0.001, latency=0)
+        results = test.run([1, 3])
+
+        self.assertEqual([r["accounts"] for r in results], [1, 3])
+        self.assertGreater(results[-1]["cycles"], 0)
+        self.assertFalse(any(t.is_alive() for t in test.threads))
+
+        report = loadtest.format_report(results)
+        self.assertIn("Capacity:", report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+from decimal import Decimal
+import unittest
+from unittest.mock import MagicMock
+
+import wexapi.models as models
+
+import dimka.bot.paper as paper
+from dimka.bot.raw import DepthLevel
+
+
+class TestPaper(unittest.TestCase):
+    def setUp(self):
+        self.live = MagicMock()
+        self.live.pair_info.return_value = models.PairInfo(3, 0.1, 100, Decimal("0.01"), 0, Decimal("0.2"))
+        self.set_depth(
+            [("1.10", "1"), ("1.20", "2")],
+            [("1.00", "1"), ("0.90", "2")],
+        )
+
+        self.feed = paper.MarketFeed(self.live, ttl=0)
+        self.exchange = paper.PaperExchange(self.feed, {"ppc": 0, "usd": 10})
+
+    def set_depth(self, asks, bids):
+        self.live.depth.return_value = (
+            [DepthLevel(*level) for level in asks],
+            [DepthLevel(*level) for level in bids],
+        )
+
+    def test_taker_order_filled_by_depth(self):
+        result = self.exchange.trade("ppc_usd", "buy", Decimal("1.20"), Decimal("2"))
+
+        # 1 by 1.10 + 1 by 1.20, fee 0.2%
+        self.assertEqual(result.order_id, 0)
+        self.assertEqual(result.received, Decimal("1.996"))
+        funds = self.exchange.funds()
+        self.assertEqual(funds["ppc"], Decimal("1.996"))
+        self.assertEqual(funds["usd"], Decimal("7.70"))
+
+        history = list(self.exchange.trade_history("ppc_usd", 10))
+        self.assertEqual([h.rate for h in history], [Decimal("1.20"), Decimal("1.10")])
+        self.assertEqual(self.exchange.order_info(history[0].order_id).status, paper.ORDER_EXECUTED)
+
+    def test_resting_order_filled_when_depth_crosses(self):
+        result = self.exchange.trade("ppc_usd", "buy", Decimal("1.05"), Decimal("2"))
+
+        self.assertEqual(result.order_id, 1)
+        self.assertEqual(len(self.exchange.active_orders("ppc_usd")), 1)
+        self.assertEqual(self.exchange.funds()["usd"], Decimal("7.90"))
+
+        self.set_depth([("1.00", "5")], [("0.90", "1")])
+
+        self.assertEqual(self.exchange.active_orders("ppc_usd"), [])
+        info = self.exchange.order_info(1)
+        self.assertEqual(info.status, paper.ORDER_EXECUTED)
+        self.assertEqual(info.amount, 0)
+        self.assertEqual(self.exchange.funds()["ppc"], Decimal("1.996"))
+
+    def test_taker_liquidity_is_not_filled_twice(self):
+        self.set_depth([("1.10", "1")], [("1.00", "1")])
+        exchange = paper.PaperExchange(paper.MarketFeed(self.live, ttl=60), {"usd": 10})
+
+        result = exchange.trade("ppc_usd", "buy", Decimal("1.10"), Decimal("5"))
+
+        self.assertEqual(result.received, Decimal("0.998"))
+        self.assertEqual(result.remains, Decimal("4"))
+
+        # same depth snapshot: level is already filled
+        exchange.match()
+        self.assertEqual(exchange.order_info(result.order_id).amount, Decimal("4"))
+        self.assertEqual(exchange.funds()["ppc"], Decimal("0.998"))
+
+    def test_missing_currency_has_zero_funds(self):
+        funds = paper.PaperExchange(self.feed, {"usd": 10}).funds()
+
+        self.assertEqual(funds["ppc"], Decimal(0))
+
+    def test_cancel_order_returns_reserved_funds(self):
+        result = self.exchange.trade("ppc_usd", "buy", Decimal("0.5"), Decimal("4"))
+
+        self.assertEqual(self.exchange.funds()["usd"], Decimal("8.0"))
+        self.exchange.cancel_order(result.order_id)
+
+        self.assertEqual(self.exchange.funds()["usd"], Decimal("10.0"))
+        self.assertEqual(self.exchange.order_info(result.order_id).status, paper.ORDER_CANCELED)
+        with self.assertRaises(paper.PaperTradeError):
+            self.exchange.cancel_order(result.order_id)
+
+    def test_not_enough_funds(self):
+        with self.assertRaises(paper.PaperTradeError):
+            self.exchange.trade("ppc_usd", "sell", Decimal("1"), Decimal("1"))
+
+    def test_feed_shared(self):
+        feed = paper.MarketFeed(self.live, ttl=60)
+        exchanges = [paper.PaperExchange(feed, {"usd": 10}) for _ in range(3)]
+
+        for exchange in exchanges:
+            exchange.depth("ppc_usd", 1)
+            exchange.equity("ppc_usd")
+
+        self.assertEqual(self.live.depth.call_count, 1)
+
+    def test_variants(self):
+        self.assertEqual(paper.variants("step=2,3; iters=5,10"), [
+            {"step": "2", "iters": "5"},
+            {"step": "2", "iters": "10"},
+            {"step": "3", "iters": "5"},
+            {"step": "3", "iters": "10"},
+        ])
+        self.assertEqual(paper.variants("high-diff=10"), [{"high_diff": "10"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+from decimal import Decimal
+import io
+import unittest
+from unittest.mock import patch, MagicMock
+
+import dimka.bot.raw as raw
+from wexapi.keyhandler import AbstractKeyHandler
+
+HISTORY = (
+    b'{"success":1,"return":{'
+    b'"3":{"pair":"ppc_usd","type":"sell","amount":1.5,"rate":1.76,"order_id":30,"is_your_order":1,"timestamp":3},'
+    b'"2":{"pair":"ppc_usd","type":"buy","amount":2,"rate":1.70000001,"order_id":20,"is_your_order":1,"timestamp":2},'
+    b'"1":{"pair":"ppc_usd","type":"buy","amount":1,"rate":1.6,"order_id":10,"is_your_order":0,"timestamp":1}'
+    b'}}'
+)
+
+
+class TestRaw(unittest.TestCase):
+    def test_trade_record(self):
+        record = raw.TradeRecord(5, {
+            "pair": "ppc_usd", "type": "buy", "amount": "0.1", "rate": 2,
+            "order_id": 7, "is_your_order": 1, "timestamp": 1,
+        })
+
+        self.assertIsInstance(record._rate, int)
+        self.assertEqual(record.rate, Decimal("2"))
+        self.assertIsInstance(record._rate, Decimal)
+        self.assertEqual(record.amount, Decimal("0.1"))
+        self.assertTrue(record.is_your_order)
+        self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_depth_level(self):
+        level = raw.DepthLevel("1.68000001", 3)
+
+        self.assertEqual(level.price, Decimal("1.68000001"))
+        self.assertEqual(level.amount, Decimal("3"))
+
+    @patch("wexapi.trade.InfoApi")
+    def test_trade_history_records(self, info_api):
+        conn = raw.RawConnection.__new__(raw.RawConnection)
+        conn.conn = None
+        conn.make_request = MagicMock(return_value=io.BytesIO(HISTORY))
+
+        handler = MagicMock(spec=AbstractKeyHandler)
+        handler.get_secret.return_value = "secret"
+        handler.get_next_nonce.return_value = 1
+
+        records = raw.RawTradeApi("key", handler, conn).trade_history_records(count_number=100, pair="ppc_usd")
+        records = list(records)
+
+        self.assertEqual([r.trade_id for r in records], [3, 2, 1])
+        self.assertEqual(records[1].rate, Decimal("1.70000001"))
+        self.assertEqual(records[1].amount, Decimal("2"))
+        self.assertFalse(records[2].is_your_order)
+
+
+if __name__ == '__main__':
+    unittest.main()
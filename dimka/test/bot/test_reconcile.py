@@ -0,0 +1,117 @@
+from argparse import Namespace
+from decimal import Decimal
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import wexapi.models as models
+
+import dimka.bot.base_bot as base_bot
+import dimka.core as core
+from dimka.bot.raw import TradeRecord
+
+
+def order(order_id, order_type="buy", rate="1.5", created=None):
+    return models.Order(order_id, "ppc_usd", order_type, Decimal("2"), Decimal(rate), created or int(time.time()), 0)
+
+
+def record(trade_id, order_id, order_type="buy", rate="1.5", timestamp=None):
+    return TradeRecord(trade_id, {
+        "pair": "ppc_usd", "type": order_type, "amount": "2", "rate": rate,
+        "order_id": order_id, "is_your_order": 1, "timestamp": timestamp or int(time.time()),
+    })
+
+
+class TestReconcile(unittest.TestCase):
+    def setUp(self):
+        config = core.config.Config()
+        config.params = {"pair": "ppc_usd", "api_backoff": 0}
+        config.log = MagicMock()
+
+        self.exchange = MagicMock()
+        self.exchange.pair_info.return_value = models.PairInfo(3, 0.1, 100, Decimal("0.01"), 0, Decimal("0.2"))
+        self.exchange.active_orders.return_value = []
+        self.exchange.trade_history.return_value = []
+
+        self.bot = base_bot.BaseBot(None, None, config, Namespace(), exchange=self.exchange)
+
+    def snapshot(self, order_id=0, trade_id=0):
+        return {"since": time.time(), "order_id": order_id, "trade_id": trade_id}
+
+    def test_new_active_order(self):
+        self.exchange.active_orders.return_value = [order(7)]
+
+        result = self.bot.reconcile_order("buy", Decimal("1.5"), self.snapshot())
+
+        self.assertEqual(result.order_id, 7)
+
+    def test_known_active_order_is_ignored(self):
+        self.exchange.active_orders.return_value = [order(7)]
+
+        self.assertIsNone(self.bot.reconcile_order("buy", Decimal("1.5"), self.snapshot(order_id=7)))
+
+    def test_new_executed_order(self):
+        self.exchange.trade_history.side_effect = lambda pair, count: iter([record(11, 8)])
+
+        result = self.bot.reconcile_order("buy", Decimal("1.5"), self.snapshot(order_id=5, trade_id=10))
+
+        self.assertEqual(result.order_id, 0)
+        self.assertEqual(result.received, Decimal("2"))
+
+    def test_stale_history_is_ignored(self):
+        # previous cycle BUY with the same price
+        self.exchange.trade_history.side_effect = lambda pair, count: iter([record(10, 5)])
+
+        self.assertIsNone(self.bot.reconcile_order("buy", Decimal("1.5"), self.snapshot(order_id=5, trade_id=10)))
+
+        # new trade of the previous cycle order
+        self.exchange.trade_history.side_effect = lambda pair, count: iter([record(11, 5)])
+
+        self.assertIsNone(self.bot.reconcile_order("buy", Decimal("1.5"), self.snapshot(order_id=5, trade_id=10)))
+
+        old = record(11, 6, timestamp=int(time.time()) - 3600)
+        self.exchange.trade_history.side_effect = lambda pair, count: iter([old])
+
+        self.assertIsNone(self.bot.reconcile_order("buy", Decimal("1.5"), self.snapshot()))
+
+    def test_failed_trade_is_reconciled(self):
+        history = [record(10, 5)]
+        self.exchange.trade_history.side_effect = lambda pair, count: iter(list(history))
+
+        def trade(*args):
+            # exchange places the order, response is lost
+            self.exchange.active_orders.return_value = [order(9)]
+            raise ConnectionResetError("reset")
+
+        self.exchange.trade.side_effect = trade
+
+        result = self.bot.create_buy_order(Decimal("1.5"), Decimal("2"))
+
+        self.assertEqual(result.order_id, 9)
+        self.assertEqual(self.exchange.trade.call_count, 1)
+
+    def test_successful_trade_has_no_extra_calls(self):
+        self.exchange.trade.return_value = models.TradeResult(0, Decimal("2"), 12, {})
+
+        self.bot.create_buy_order(Decimal("1.5"), Decimal("2"))
+
+        calls = [name for name, _, _ in self.exchange.method_calls if name != "pair_info"]
+        self.assertEqual(calls, ["trade"])
+
+    def test_failed_trade_with_stale_history_is_retried(self):
+        self.exchange.trade_history.side_effect = lambda pair, count: iter([record(10, 5)])
+        # history seen by the cycle before the trade
+        list(self.bot.history_records())
+        self.exchange.trade.side_effect = [
+            ConnectionResetError("reset"),
+            models.TradeResult(0, Decimal("2"), 12, {}),
+        ]
+
+        result = self.bot.create_buy_order(Decimal("1.5"), Decimal("2"))
+
+        self.assertEqual(result.order_id, 12)
+        self.assertEqual(self.exchange.trade.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
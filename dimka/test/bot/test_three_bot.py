@@ -0,0 +1,170 @@
+from argparse import Namespace
+from decimal import Decimal
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import wexapi.models as wex_models
+
+import dimka.bot.paper as paper
+import dimka.core as core
+import dimka.core.journal as journal
+import dimka.core.models as models
+import dimka.core.tracing as tracing
+from dimka.bot.raw import DepthLevel
+from dimka.bot.three import bot as three
+
+
+class TestThreeBotResume(unittest.TestCase):
+    def setUp(self):
+        models.database.init(":memory:")
+        models.database.create_tables([models.OrderInfo, models.Ticker])
+
+        self.live = MagicMock()
+        self.live.pair_info.return_value = wex_models.PairInfo(3, 0.1, 100, Decimal("0.01"), 0, Decimal("0.2"))
+        self.live.ticker.return_value = wex_models.Ticker(
+            Decimal("1.2"), Decimal("0.9"), Decimal("1.05"), 0, 0, Decimal("1.05"), Decimal("1.1"), Decimal("1"), 0,
+        )
+        self.set_depth("1.10", "1.00")
+
+        self.directory = tempfile.TemporaryDirectory()
+        config = core.config.Config()
+        config.params = {
+            "pair": "ppc_usd",
+            "pair_units": 8,
+            "bot_name": "three",
+            "journal_path": os.path.join(self.directory.name, "bot.journal"),
+        }
+        config.log = MagicMock()
+
+        self.exchange = paper.PaperExchange(paper.MarketFeed(self.live, ttl=0), {"usd": 10, "ppc": 0})
+        self.bot = three.Bot(
+            None,
+            None,
+            config,
+            Namespace(step=3, iters=1, iters_time=0, high_diff=50, market_data=None),
+            exchange=self.exchange,
+        )
+        self.bot.sleep = lambda seconds: None
+
+    def tearDown(self):
+        models.database.close()
+        self.directory.cleanup()
+
+    def set_depth(self, ask: str, bid: str):
+        self.live.depth.return_value = ([DepthLevel(ask, "100")], [DepthLevel(bid, "100")])
+
+    def local_orders(self, order_type: str):
+        return list(models.OrderInfo.select().where(models.OrderInfo.order_type == order_type))
+
+    def test_resume_buy(self):
+        order = self.exchange.trade("ppc_usd", "buy", Decimal("1.05"), Decimal("2"))
+        self.bot.journal.write(phase=three.PHASE_BUY, order_id=order.order_id)
+
+        # BUY order is executed while bot was down
+        self.set_depth("1.04", "1.00")
+        self.bot.run()
+
+        self.assertIsNone(self.bot.journal.phase)
+        self.assertEqual(len(self.local_orders("buy")), 1)
+        self.assertEqual(len(self.local_orders("sell")), 3)
+        self.assertEqual(len(self.exchange.active_orders("ppc_usd")), 3)
+
+    def test_resume_sell(self):
+        parent = models.OrderInfo.create(
+            pair="ppc_usd", order_type="buy", amount=Decimal("3"), rate=Decimal("1"),
+            created=0, created_timestamp=0,
+        )
+        self.exchange.balances["ppc"] = Decimal("3")
+        self.bot.journal.write(phase=three.PHASE_SELL, parent_order=parent.id)
+
+        self.bot.run()
+
+        self.assertIsNone(self.bot.journal.phase)
+        rates = sorted(o.rate for o in self.exchange.active_orders("ppc_usd"))
+        self.assertEqual(rates, [Decimal("1.030"), Decimal("1.060"), Decimal("1.092")])
+        self.assertTrue(all(o.parent_order_id == parent.id for o in self.local_orders("sell")))
+
+    def test_resume_ladder_with_unsaved_order(self):
+        self.exchange.balances["ppc"] = Decimal("3")
+        prices = [Decimal("1.2"), Decimal("1.3"), Decimal("1.4")]
+        # first order placed and saved, second placed but not saved before the crash
+        first = self.exchange.trade("ppc_usd", "sell", prices[0], Decimal("1"))
+        self.bot.save_order(self.exchange.order_info(first.order_id))
+        self.exchange.trade("ppc_usd", "sell", prices[1], Decimal("1"))
+        self.bot.journal.write(
+            phase=three.PHASE_LADDER, parent_order=None, amount=Decimal("1"), prices=prices, placed=1,
+        )
+
+        self.bot.run()
+
+        self.assertIsNone(self.bot.journal.phase)
+        self.assertEqual(len(self.exchange.active_orders("ppc_usd")), 3)
+        self.assertEqual(sorted(o.rate for o in self.local_orders("sell")), prices)
+
+    def test_resume_ladder_saved_order_is_not_duplicated(self):
+        self.exchange.balances["ppc"] = Decimal("2")
+        prices = [Decimal("1.2"), Decimal("1.3")]
+        first = self.exchange.trade("ppc_usd", "sell", prices[0], Decimal("1"))
+        self.bot.save_order(self.exchange.order_info(first.order_id))
+        self.bot.journal.write(
+            phase=three.PHASE_LADDER, parent_order=None, amount=Decimal("1"), prices=prices, placed=0,
+        )
+
+        self.bot.run()
+
+        self.assertEqual(len(self.exchange.active_orders("ppc_usd")), 2)
+        self.assertEqual(sorted(o.rate for o in self.local_orders("sell")), prices)
+
+    def test_journal_and_local_orders_are_traced(self):
+        parent = models.OrderInfo.create(
+            pair="ppc_usd", order_type="buy", amount=Decimal("3"), rate=Decimal("1"),
+            created=0, created_timestamp=0,
+        )
+        self.exchange.balances["ppc"] = Decimal("3")
+        self.bot.journal.write(phase=three.PHASE_SELL, parent_order=parent.id)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            self.bot.tracer = tracing.Tracer(path)
+            with self.bot.tracer.span("cycle"):
+                self.bot.run()
+
+            spans = {span["name"]: span for trace in tracing.read_traces(path) for span in trace}
+
+        for name in ("get_local_order", "journal_write", "journal_clear"):
+            self.assertEqual(spans[name]["attributes"]["category"], tracing.DB)
+        self.assertEqual(spans["journal_write"]["attributes"]["phase"], three.PHASE_LADDER)
+
+    def test_no_resume_without_journal(self):
+        self.bot.journal = journal.StateJournal()
+
+        def fail(order_id):
+            raise ConnectionResetError("reset")
+
+        self.bot.wait_buy_order = fail
+        with self.assertRaises(ConnectionResetError):
+            self.bot.run()
+
+        # next cycle starts from scratch (cancels BUY order)
+        self.assertIsNone(self.bot.journal.phase)
+
+    def test_unknown_phase_is_cleared(self):
+        self.bot.journal.write(phase="unknown")
+
+        self.bot.run()
+
+        self.assertIsNone(self.bot.journal.phase)
+
+    def test_failed_resume_clears_journal(self):
+        self.bot.journal.write(phase=three.PHASE_BUY, order_id=100)
+
+        with self.assertRaises(paper.PaperTradeError):
+            self.bot.run()
+
+        self.assertIsNone(self.bot.journal.phase)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,11 @@
+import logging
 import unittest
 import os.path
 import tempfile
 import sys
 
 from dimka.core.app import Application
+from dimka.core.config import ConfigError
 
 
 class TestConfig(unittest.TestCase):
@@ -29,6 +31,46 @@ class TestConfig(unittest.TestCase):
 
         self.assertTrue(os.path.isfile(self.db))
 
+    def test_app_memory_database(self):
+        self._create_config(self.conf, self.db)
+        with open(self.conf, "a") as f:
+            f.write("db_storage: memory\n")
+
+        sys.argv = ["--config", self.conf]
+        app = Application('bot')
+        app.init()
+
+        self.assertIsNotNone(app.storage)
+        self.assertTrue(os.path.isfile(self.db))
+        app.storage.close()
+        app.storage = None
+
+    def test_app_config_args(self):
+        self._create_config(self.conf, self.db)
+        with open(self.conf, "a") as f:
+            f.write("args:\n  step: \"2\"\n  debug: true\n")
+
+        sys.argv = ["--config", self.conf]
+        app = Application('bot')
+        app.add_argument("--step", default=1, type=int)
+        app.init()
+
+        self.assertEqual(app.args.step, 2)
+        self.assertTrue(app.args.debug)
+        self.assertEqual(app.log.level, logging.DEBUG)
+
+    def test_app_invalid_config_args(self):
+        self._create_config(self.conf, self.db)
+        with open(self.conf, "a") as f:
+            f.write("args:\n  mode: fast\n")
+
+        sys.argv = ["--config", self.conf]
+        app = Application('bot')
+        app.add_argument("--mode", default="slow", choices=["slow"])
+
+        with self.assertRaises(ConfigError):
+            app.init()
+
     def _create_config(self, conf, db_path):
         if os.path.isfile(conf):
             os.remove(conf)
@@ -0,0 +1,105 @@
+import datetime
+from decimal import Decimal
+import shutil
+import tempfile
+import unittest
+
+import dimka.core.columnar as columnar
+import dimka.core.models as models
+
+
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+        models.database.init(":memory:")
+        models.database.create_tables([models.Ticker, models.OrderInfo])
+
+    def tearDown(self):
+        models.database.close()
+        shutil.rmtree(self.path)
+
+    def test_export_tickers(self):
+        self._create_ticker(1, "1.2345678901")
+        self._create_ticker(2, "2.5")
+
+        self.assertEqual(columnar.export_tickers(self.path), 2)
+
+        store = columnar.ColumnarStore(self.path)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.decimals("high"), [Decimal("1.2345678901"), Decimal("2.5")])
+        self.assertEqual(store.strings("pair"), ["ppc_usd", "ppc_usd"])
+        self.assertEqual(list(store.column("id")), [1, 2])
+        self.assertEqual(
+            store.column("updated_timestamp")[1].astype(datetime.datetime),
+            datetime.datetime(2018, 6, 15, 12, 0, 2),
+        )
+
+    def test_incremental_export(self):
+        self._create_ticker(1, "1")
+        self.assertEqual(columnar.export_tickers(self.path), 1)
+        self.assertEqual(columnar.export_tickers(self.path), 0)
+
+        self._create_ticker(2, "2")
+        self.assertEqual(columnar.export_tickers(self.path, batch_size=1), 1)
+
+        store = columnar.ColumnarStore(self.path)
+        self.assertEqual(store.last_id, 2)
+        self.assertEqual(store.decimals("last"), [Decimal("1"), Decimal("2")])
+
+    def test_uncommitted_tail_is_ignored(self):
+        store = columnar.ColumnarStore(self.path, (("id", columnar.ID, 0), ("rate", columnar.FIXED, 2)))
+        store.append([{"id": 1, "rate": "1.5"}])
+
+        # simulate interrupted append: data written, manifest not committed
+        with open(store._column_file("rate"), "ab") as f:
+            f.write(b"\x00" * 8)
+
+        store = columnar.ColumnarStore(self.path)
+        self.assertEqual(len(store.column("rate")), 1)
+
+        store.append([{"id": 2, "rate": "2.25"}])
+        self.assertEqual(store.decimals("rate"), [Decimal("1.5"), Decimal("2.25")])
+
+    def test_export_orders(self):
+        now = datetime.datetime(2018, 6, 15, 12, 0, 0)
+        parent = models.OrderInfo.create(
+            pair="ppc_usd", order_type="buy", amount="1", rate="1.7",
+            created=now, created_timestamp=now,
+        )
+        models.OrderInfo.create(
+            pair="ppc_usd", order_type="sell", amount="1", rate="1.75",
+            parent_order=parent, created=now, created_timestamp=now,
+        )
+
+        self.assertEqual(columnar.export_orders(self.path), 2)
+
+        store = columnar.ColumnarStore(self.path)
+        self.assertEqual(store.strings("order_type"), ["buy", "sell"])
+        self.assertEqual(list(store.column("parent_order")), [-1, parent.id])
+        self.assertEqual(store.decimals("rate"), [Decimal("1.7"), Decimal("1.75")])
+
+    def test_missing_values(self):
+        store = columnar.ColumnarStore(self.path, (("rate", columnar.FIXED, 2), ("pair", columnar.CATEGORY, 0)))
+        store.append([{"rate": "1.5", "pair": "ppc_usd"}, {"rate": None, "pair": None}, {"rate": "0", "pair": "btc_usd"}])
+        store.append([{"rate": "2", "pair": "btc_usd"}, {"rate": "3", "pair": "ppc_usd"}])
+
+        store = columnar.ColumnarStore(self.path)
+        self.assertEqual(store.decimals("rate"), [Decimal("1.5"), None, Decimal("0"), Decimal("2"), Decimal("3")])
+        self.assertEqual(store.strings("pair"), ["ppc_usd", None, "btc_usd", "btc_usd", "ppc_usd"])
+        self.assertEqual(store.categories("pair"), ["ppc_usd", "btc_usd"])
+
+    def test_missing_store(self):
+        with self.assertRaises(FileNotFoundError):
+            columnar.ColumnarStore(self.path)
+
+    def _create_ticker(self, second: int, price: str):
+        updated = datetime.datetime(2018, 6, 15, 12, 0, second)
+        models.Ticker.create(
+            pair="ppc_usd", high=price, low=price, avg=price, last=price, buy=price, sell=price,
+            vol="1", vol_cur="1", updated=updated, updated_timestamp=updated,
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
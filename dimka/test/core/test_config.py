@@ -29,6 +29,47 @@ class TestConfig(unittest.TestCase):
         self.assertEqual(result.get('db_path'), '/var/www/data/test_app.sqlite3')
         self.assertEqual(result.get('key_path'), '/var/www/conf/keys.txt.dist')
 
+    def test_invalid_config(self):
+        with self.assertRaises(config.ConfigError):
+            config.Config.validate({"db_path": "/tmp/db.sqlite3"})
+
+        with self.assertRaises(config.ConfigError):
+            config.Config.validate({"db_path": "/tmp/db", "key_path": "/tmp/keys", "pair_units": "8"})
+
+    def test_reload(self):
+        file = os.path.join(tempfile.gettempdir(), "conf_reload.yaml")
+        self._write(file, "pair: ppc_usd\npair_units: 8\n", 1000)
+
+        conf = config.Config()
+        params = conf.parse_config(argparse.Namespace(config=file))
+        self.assertEqual(conf.reload(), {})
+
+        # pair can't be changed without restart
+        self._write(file, "pair: btc_usd\npair_units: 4\nargs:\n  step: 2\n", 2000)
+        self.assertEqual(conf.reload(), {"pair_units": 4, "args": {"step": 2}})
+        self.assertIs(conf.params, params)
+        self.assertEqual(params["pair_units"], 4)
+        self.assertEqual(params["pair"], "ppc_usd")
+
+        # invalid config is rejected
+        self._write(file, "pair: ppc_usd\npair_units: many\n", 3000)
+        self.assertEqual(conf.reload(), {})
+        self.assertEqual(params["pair_units"], 4)
+
+        self._write(file, "pair: ppc_usd\n", 4000)
+        self.assertEqual(conf.reload(), {"pair_units": None, "args": None})
+        self.assertNotIn("pair_units", params)
+
+        os.remove(file)
+
+    def _write(self, file, content, mtime):
+        with open(file, "w") as f:
+            f.write("db_path: /var/www/data/test_app.sqlite3\n")
+            f.write("key_path: /var/www/conf/keys.txt.dist\n")
+            f.write(content)
+
+        os.utime(file, (mtime, mtime))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+from decimal import Decimal
+import os
+import tempfile
+import unittest
+
+from dimka.core.journal import StateJournal
+
+
+class TestStateJournal(unittest.TestCase):
+    file = os.path.join(tempfile.gettempdir(), "bot.journal")
+
+    def tearDown(self):
+        super().tearDown()
+        if os.path.isfile(self.file):
+            os.remove(self.file)
+
+    def test_resume_last_state(self):
+        journal = StateJournal(self.file)
+        self.assertEqual(journal.state, {})
+        self.assertIsNone(journal.phase)
+
+        journal.write(phase="buy", order_id=10)
+        journal.write(phase="ladder", amount=Decimal("0.5"), prices=[Decimal("1.1")], placed=0)
+
+        journal = StateJournal(self.file)
+        self.assertEqual(journal.phase, "ladder")
+        self.assertEqual(journal.state["amount"], "0.5")
+        self.assertEqual(journal.state["prices"], ["1.1"])
+
+        journal.clear()
+        self.assertIsNone(StateJournal(self.file).phase)
+
+    def test_torn_record_is_ignored(self):
+        journal = StateJournal(self.file)
+        journal.write(phase="buy", order_id=10)
+
+        with open(self.file, "a") as f:
+            f.write('{"phase": "sell", "parent')
+
+        journal = StateJournal(self.file)
+        self.assertEqual(journal.state, {"phase": "buy", "order_id": 10})
+
+    def test_write_after_torn_record(self):
+        journal = StateJournal(self.file)
+        journal.write(phase="buy", order_id=1)
+
+        with open(self.file, "a") as f:
+            f.write('{"phase": "sell", "parent')
+
+        journal = StateJournal(self.file)
+        journal.clear()
+        journal.write(phase="sell", parent_order=2)
+
+        journal = StateJournal(self.file)
+        self.assertEqual(journal.state, {"phase": "sell", "parent_order": 2})
+        self.assertEqual(journal.records, 3)
+
+    def test_compact(self):
+        journal = StateJournal(self.file, compact_every=3)
+        for i in range(10):
+            journal.write(phase="buy", order_id=i)
+
+        with open(self.file) as f:
+            self.assertLessEqual(len(f.readlines()), 3)
+
+        self.assertEqual(StateJournal(self.file).state["order_id"], 9)
+
+    def test_disabled_without_path(self):
+        journal = StateJournal()
+        journal.write(phase="sell", parent_order=None)
+
+        self.assertIsNone(journal.phase)
+        self.assertEqual(journal.state, {})
+        self.assertFalse(os.path.isfile(self.file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+from decimal import Decimal
+import json
+import logging
+import unittest
+
+import dimka.core.log as log
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class Unprintable(object):
+    def __str__(self):
+        raise AssertionError("Argument should not be rendered")
+
+
+class TestLog(unittest.TestCase):
+    def test_lazy_decimal(self):
+        self.assertEqual(str(log.LazyDecimal(Decimal("0.5689"), 3)), "0.569")
+        self.assertEqual(str(log.LazyDecimal(0, 8)), "0.00000000")
+        self.assertEqual("%s" % log.LazyDecimal("1.2", 2), "1.20")
+
+    def test_disabled_level_is_not_rendered(self):
+        logger = logging.Logger("test_disabled", logging.WARNING)
+        handler = ListHandler()
+        listener = log.start_listener(logger, [handler])
+
+        logger.debug("value: %s", Unprintable())
+        logger.warning("value: %s", log.LazyDecimal("1.5", 2))
+        listener.stop()
+
+        self.assertEqual(handler.messages, ["value: 1.50"])
+
+    def test_record_is_formatted_in_listener(self):
+        records = []
+        handler = log.QueueHandler(None)
+        handler.enqueue = records.append
+
+        logger = logging.Logger("test_queue", logging.DEBUG)
+        logger.addHandler(handler)
+        logger.info("value: %s", 1)
+
+        self.assertEqual(records[0].msg, "value: %s")
+        self.assertEqual(records[0].args, (1,))
+
+    def test_json_formatter(self):
+        record = logging.LogRecord("bot", logging.INFO, __file__, 1, "Order #%s", (10,), None)
+        data = json.loads(log.JsonFormatter().format(record))
+
+        self.assertEqual(data["message"], "Order #10")
+        self.assertEqual(data["level"], "INFO")
+        self.assertEqual(data["logger"], "bot")
+
+
+if __name__ == '__main__':
+    unittest.main()
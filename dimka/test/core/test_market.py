@@ -0,0 +1,85 @@
+from decimal import Decimal
+import os
+import tempfile
+import time
+import unittest
+
+import dimka.core.market as market
+
+TICKER = {
+    "high": 1.76, "low": 1.64, "avg": 1.7, "last": 1.671, "buy": 1.693, "sell": 1.671,
+    "vol": 16996.31852, "vol_cur": 10008.14535,
+}
+
+
+class TestMarketData(unittest.TestCase):
+    file = os.path.join(tempfile.gettempdir(), "market.mmap")
+
+    def setUp(self):
+        self.writer = market.MarketDataWriter.create(self.file, ["ppc_usd", "btc_usd"], slots=2)
+        self.reader = market.MarketDataReader(self.file)
+
+    def tearDown(self):
+        self.writer.close()
+        self.reader.close()
+        os.remove(self.file)
+
+    def test_publish(self):
+        self.assertEqual(self.reader.pairs, ["ppc_usd", "btc_usd"])
+        self.assertIsNone(self.reader.latest("ppc_usd"))
+        self.assertIsNone(self.reader.latest("ltc_usd"))
+
+        self.writer.publish("ppc_usd", TICKER, [[1.68, 10]], [[Decimal("1.67"), 2]], updated=100)
+        data = self.reader.latest("ppc_usd")
+
+        self.assertEqual(data.updated, 100)
+        self.assertEqual(data.high, Decimal("1.76"))
+        self.assertEqual(data.vol_cur, Decimal("10008.14535"))
+        self.assertEqual(data.ask_price, Decimal("1.68"))
+        self.assertEqual(data.bid_price, Decimal("1.67"))
+        self.assertEqual(data.bid_amount, Decimal("2"))
+        self.assertIsNone(self.reader.latest("btc_usd"))
+
+    def test_ring_wraps(self):
+        for i in range(5):
+            self.writer.publish("btc_usd", TICKER, [[100 + i, 1]], [[99, 1]])
+
+        self.assertEqual(self.reader.latest("btc_usd").ask_price, Decimal("104"))
+
+    def test_empty_depth_side(self):
+        self.writer.publish("ppc_usd", TICKER, [], [[1.67, 2]])
+        data = self.reader.latest("ppc_usd")
+
+        self.assertIsNone(data.ask_price)
+        self.assertIsNone(data.ask_amount)
+        self.assertEqual(data.bid_price, Decimal("1.67"))
+
+    def test_fresh(self):
+        self.writer.publish("ppc_usd", TICKER, [], [], updated=time.time() - 60)
+
+        self.assertIsNone(self.reader.fresh("ppc_usd", 10))
+        self.assertIsNotNone(self.reader.fresh("ppc_usd", 120))
+
+    def test_slot_in_progress_is_not_read(self):
+        self.writer.publish("ppc_usd", TICKER, [], [])
+
+        # make latest slot sequence odd (writer in the middle of the write)
+        offset = self.writer.offsets["ppc_usd"] + market.HEAD.size
+        market.SEQ.pack_into(self.writer._mmap, offset, 3)
+
+        self.assertIsNone(self.reader.latest("ppc_usd", retries=3))
+
+    def test_write_after_killed_writer(self):
+        # writer was killed in the middle of the write to the first slot
+        offset = self.writer.offsets["ppc_usd"] + market.HEAD.size
+        market.SEQ.pack_into(self.writer._mmap, offset, 1)
+
+        for i in range(4):
+            self.writer.publish("ppc_usd", TICKER, [[100 + i, 1]], [[99, 1]])
+
+            self.assertEqual(self.reader.latest("ppc_usd", retries=1).ask_price, Decimal(100 + i))
+            self.assertEqual(market.SEQ.unpack_from(self.writer._mmap, offset)[0] % 2, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import threading
+import time
+import unittest
+
+from dimka.core.app import RestartBotException
+import dimka.core.resilience as resilience
+
+PARAMS = {
+    "api_retries": 3,
+    "api_backoff": 0,
+    "api_hedge_min_samples": 3,
+    "breaker_threshold": 2,
+    "breaker_timeout": 60,
+}
+
+
+class Flaky(object):
+    def __init__(self, failures: int, result="ok"):
+        self.failures = failures
+        self.calls = 0
+        self.result = result
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionResetError("reset")
+
+        return self.result
+
+
+class TestResilience(unittest.TestCase):
+    def test_retry(self):
+        r = resilience.Resilience(dict(PARAMS, breaker_threshold=10))
+        fn = Flaky(2)
+
+        self.assertEqual(r.call("depth", fn), "ok")
+        self.assertEqual(fn.calls, 3)
+
+        with self.assertRaises(ConnectionResetError):
+            r.call("depth", Flaky(3))
+
+    def test_not_transient_error_is_not_retried(self):
+        r = resilience.Resilience(PARAMS)
+        calls = []
+
+        def fn():
+            calls.append(1)
+            raise Exception("Trade call failed with error: not enough funds")
+
+        with self.assertRaises(Exception):
+            r.call("Trade", fn)
+        self.assertEqual(len(calls), 1)
+
+    def test_reconcile(self):
+        r = resilience.Resilience(dict(PARAMS, breaker_threshold=10))
+        fn = Flaky(1)
+
+        self.assertEqual(r.call("Trade", fn, reconcile=lambda: "placed"), "placed")
+        self.assertEqual(fn.calls, 1)
+
+        fn = Flaky(1)
+        self.assertEqual(r.call("Trade", fn, reconcile=lambda: None), "ok")
+        self.assertEqual(fn.calls, 2)
+
+    def test_circuit_breaker(self):
+        r = resilience.Resilience(PARAMS)
+
+        with self.assertRaises(ConnectionResetError):
+            r.call("ticker", Flaky(5))
+
+        fn = Flaky(0)
+        with self.assertRaises(resilience.CircuitOpenError) as e:
+            r.call("ticker", fn)
+
+        self.assertIsInstance(e.exception, RestartBotException)
+        self.assertEqual(fn.calls, 0)
+        # other endpoints are not affected
+        self.assertEqual(r.call("depth", fn), "ok")
+
+        r.breaker("ticker").opened -= 60
+        self.assertEqual(r.call("ticker", fn), "ok")
+        self.assertIsNone(r.breaker("ticker").opened)
+
+    def test_hedged_request(self):
+        r = resilience.Resilience(PARAMS)
+        for _ in range(3):
+            r.latency["depth"].add(0.01)
+
+        calls = []
+        lock = threading.Lock()
+
+        def fn():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+
+            if first:
+                time.sleep(0.5)
+                return "slow"
+
+            return "fast"
+
+        self.assertEqual(r.call("depth", fn, hedge=True), "fast")
+        self.assertEqual(len(calls), 2)
+
+    def test_hedged_requests_are_daemon_threads(self):
+        r = resilience.Resilience(PARAMS)
+        for _ in range(3):
+            r.latency["depth"].add(0.01)
+
+        daemons = []
+
+        def fn():
+            daemons.append(threading.current_thread().daemon)
+            return "ok"
+
+        self.assertEqual(r.call("depth", fn, hedge=True), "ok")
+        self.assertTrue(all(daemons))
+
+    def test_attempt_timeout_is_bounded_by_deadline(self):
+        r = resilience.Resilience(dict(PARAMS, api_deadline=5))
+        timeouts = []
+
+        def fn():
+            timeouts.append(r.timeout())
+            return "ok"
+
+        r.call("getInfo", fn)
+
+        self.assertLessEqual(timeouts[0], 5)
+        self.assertGreater(timeouts[0], 4)
+        self.assertEqual(r.timeout(), 30)
+
+    def test_latency_percentile(self):
+        tracker = resilience.LatencyTracker()
+        self.assertIsNone(tracker.percentile(95))
+
+        for i in range(1, 101):
+            tracker.add(i)
+
+        self.assertEqual(tracker.percentile(95), 95)
+        self.assertEqual(tracker.percentile(100), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
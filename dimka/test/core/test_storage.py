@@ -0,0 +1,105 @@
+import datetime
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import dimka.core.models as models
+from dimka.core.storage import MemoryStorage
+
+
+class TestMemoryStorage(unittest.TestCase):
+    db = os.path.join(tempfile.gettempdir(), "memory_storage.sqlite3")
+
+    def tearDown(self):
+        super().tearDown()
+        if os.path.isfile(self.db):
+            os.remove(self.db)
+
+    def test_snapshot_and_load(self):
+        storage = MemoryStorage(models.database, self.db, interval=60)
+        self.assertFalse(storage.open())
+        models.database.create_tables([models.OrderInfo])
+        self._create_order("1.5")
+
+        # nothing is written to the disk before snapshot
+        self.assertFalse(os.path.isfile(self.db))
+
+        storage.close()
+        self.assertEqual(self._count_orders(), 1)
+
+        storage = MemoryStorage(models.database, self.db, interval=60)
+        self.assertTrue(storage.open())
+        self.assertEqual(models.OrderInfo.select().count(), 1)
+        self._create_order("1.6")
+        storage.close()
+
+        self.assertEqual(self._count_orders(), 2)
+
+    def test_periodic_snapshot(self):
+        storage = MemoryStorage(models.database, self.db, interval=0.05)
+        storage.open()
+        models.database.create_tables([models.OrderInfo])
+        self._create_order("1.5")
+
+        deadline = time.time() + 5
+        while time.time() < deadline and not self._count_orders():
+            time.sleep(0.05)
+
+        storage.close()
+        self.assertEqual(self._count_orders(), 1)
+
+    def test_paged_snapshot(self):
+        storage = MemoryStorage(models.database, self.db, interval=60, pages=1)
+        storage.open()
+        models.database.create_tables([models.OrderInfo])
+        for i in range(200):
+            self._create_order("1.{}".format(i))
+
+        with mock.patch("dimka.core.storage.os.fsync", wraps=os.fsync) as fsync:
+            storage.snapshot()
+
+        self.assertEqual(self._count_orders(), 200)
+        # database directory is fsynced after the file replace
+        fsync.assert_called_once()
+        storage.close()
+
+    def test_dump_snapshot_and_load(self):
+        with mock.patch("dimka.core.storage.BACKUP_API", False):
+            storage = MemoryStorage(models.database, self.db, interval=60)
+            storage.open()
+            models.database.create_tables([models.OrderInfo])
+            self._create_order("1.5")
+            storage.close()
+
+            self.assertEqual(self._count_orders(), 1)
+
+            storage = MemoryStorage(models.database, self.db, interval=60)
+            self.assertTrue(storage.open())
+            self.assertEqual(models.OrderInfo.select().count(), 1)
+            storage.close()
+
+    def _create_order(self, rate: str):
+        now = datetime.datetime.now()
+        models.OrderInfo.create(
+            pair="ppc_usd", order_type="buy", amount="1", rate=rate,
+            created=now, created_timestamp=now,
+        )
+
+    def _count_orders(self) -> int:
+        if not os.path.isfile(self.db):
+            return 0
+
+        conn = sqlite3.connect(self.db)
+        try:
+            return conn.execute("SELECT count(*) FROM orderinfo").fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
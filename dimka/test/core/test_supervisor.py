@@ -0,0 +1,28 @@
+import os
+import tempfile
+import unittest
+
+from dimka.core.supervisor import Supervisor
+
+
+class TestSupervisor(unittest.TestCase):
+    def test_pairs(self):
+        files = []
+        for pair in ("ppc_usd", "btc_usd", "ppc_usd"):
+            f = tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False)
+            f.write("db_path: /tmp/db.sqlite3\nkey_path: /tmp/keys.txt\npair: {}\n".format(pair))
+            f.close()
+            files.append(f.name)
+
+        try:
+            self.assertEqual(
+                Supervisor.pairs([{"config": file} for file in files]),
+                ["ppc_usd", "btc_usd"],
+            )
+        finally:
+            for file in files:
+                os.remove(file)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+from decimal import Decimal
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+import dimka.core.tracing as tracing
+
+
+class Bot(object):
+    pair = "ppc_usd"
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    @tracing.traced("top_sell_price", category=None)
+    def top_sell_price(self):
+        return self.depth()
+
+    @tracing.traced("depth")
+    def depth(self):
+        return Decimal("1.7")
+
+    @tracing.traced("create_buy_order")
+    def create_buy_order(self, price, amount):
+        class Result(object):
+            order_id = 42
+        return Result()
+
+    @tracing.traced("save_order", category=tracing.DB)
+    def save_order(self, order):
+        pass
+
+
+class TestTracing(unittest.TestCase):
+    file = os.path.join(tempfile.gettempdir(), "trace.json")
+
+    def tearDown(self):
+        super().tearDown()
+        if os.path.isfile(self.file):
+            os.remove(self.file)
+
+    def test_disabled_tracer(self):
+        tracer = tracing.Tracer()
+        with tracer.span("cycle") as span:
+            span.set("key", "value")
+            Bot(tracer).create_buy_order(1, 2)
+
+        self.assertFalse(os.path.isfile(self.file))
+
+    def test_export_cycle(self):
+        tracer = tracing.Tracer(self.file)
+        bot = Bot(tracer)
+
+        for _ in range(2):
+            with tracer.span("cycle", bot="three"):
+                price = bot.top_sell_price()
+                bot.create_buy_order(price, Decimal("0.5"))
+                bot.save_order(object())
+                tracer.sleep(0.01)
+
+        with open(self.file) as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 2)
+
+        spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        by_name = {span["name"]: span for span in spans}
+        self.assertEqual(len(spans), 6)
+        self.assertNotIn("parentSpanId", by_name["cycle"])
+        self.assertEqual(by_name["depth"]["parentSpanId"], by_name["top_sell_price"]["spanId"])
+        self.assertEqual(len({span["traceId"] for span in spans}), 1)
+
+        attributes = {a["key"]: a["value"] for a in by_name["create_buy_order"]["attributes"]}
+        self.assertEqual(attributes["price"], {"stringValue": "1.7"})
+        self.assertEqual(attributes["order_id"], {"intValue": "42"})
+        self.assertEqual(attributes["pair"], {"stringValue": "ppc_usd"})
+
+        summary = tracing.summarize(tracing.read_traces(self.file))
+        self.assertEqual(summary["cycles"]["count"], 2)
+        self.assertEqual(summary["tick_to_order"]["count"], 2)
+        self.assertEqual(summary["spans"]["depth"]["count"], 2)
+        self.assertEqual(set(summary["phases"]), {"network", "db", "sleep", "other"})
+        self.assertEqual(summary["critical_path"][0][0], "cycle")
+        self.assertIn("Critical path", tracing.format_summary(summary))
+
+    def test_log_time(self):
+        tracer = tracing.Tracer(self.file)
+        logger = logging.getLogger("test-tracing")
+        logger.addHandler(logging.NullHandler())
+        log = tracing.TracedLogger(logger, tracer)
+
+        with tracer.span("cycle"):
+            log.warning("outside of spans")
+
+        with tracer.span("cycle"):
+            with tracer.span("save_order", category=tracing.DB):
+                # accounted by DB phase
+                log.warning("inside DB span")
+
+        traces = tracing.read_traces(self.file)
+        cycles = [span for trace in traces for span in trace if span["name"] == "cycle"]
+        self.assertGreater(cycles[0]["attributes"]["log_time"], 0)
+        self.assertNotIn("log_time", cycles[1]["attributes"])
+
+        summary = tracing.summarize(traces)
+        self.assertEqual(summary["phases"][tracing.LOG][0], cycles[0]["attributes"]["log_time"])
+        self.assertIs(log.level, logger.level)
+
+    def test_error_status(self):
+        tracer = tracing.Tracer(self.file)
+        with self.assertRaises(ValueError):
+            with tracer.span("cycle"):
+                raise ValueError("bad")
+
+        with open(self.file) as f:
+            span = json.loads(f.readline())["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+
+        self.assertEqual(span["status"]["code"], tracing.STATUS_ERROR)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,6 +39,15 @@ class TestUtils(unittest.TestCase):
             str(utils.td(0.345, 2)),
         )
 
+    def test_fixed_point(self):
+        self.assertEqual(utils.to_fixed('1.23456789', 8), 123456789)
+        self.assertEqual(utils.to_fixed(Decimal('2.5'), 2), 250)
+        self.assertEqual(utils.from_fixed(123456789, 8), Decimal('1.23456789'))
+        self.assertEqual(
+            utils.from_fixed(utils.to_fixed('0.345', 3), 3),
+            Decimal('0.345'),
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
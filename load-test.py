@@ -0,0 +1,87 @@
+import argparse
+import logging
+import os
+import tempfile
+
+from dimka.core.config import Config
+from dimka.bot.loadtest import LoadTest, format_report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test: simulated accounts in one process against the exchange double")
+    parser.add_argument(
+        "config",
+        type=str,
+        help="Bot config yaml file (full path): /var/www/config/config.yaml. Used: pair, pair_units, args, paper_funds",
+    )
+    parser.add_argument(
+        "--bot",
+        default="three",
+        type=str,
+        help="Bot name",
+    )
+    parser.add_argument(
+        "--accounts",
+        default="1,10,50,100,200",
+        type=str,
+        help="Accounts count of each ramp step: 1,10,50,100",
+    )
+    parser.add_argument(
+        "--duration",
+        default=30,
+        type=float,
+        help="Step measurement time in seconds",
+    )
+    parser.add_argument(
+        "--warmup",
+        default=5,
+        type=float,
+        help="Time in seconds before step measurement",
+    )
+    parser.add_argument(
+        "--time-scale",
+        default=0.01,
+        type=float,
+        help="Bot sleeps (orders waiting, pauses between cycles) scale",
+    )
+    parser.add_argument(
+        "--latency",
+        default=0.02,
+        type=float,
+        help="Mean simulated exchange call latency in seconds",
+    )
+    parser.add_argument(
+        "--db-path",
+        default=os.path.join(tempfile.gettempdir(), "load-test.sqlite3"),
+        type=str,
+        help="Load test database file (recreated)",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Show bots log",
+    )
+    args = parser.parse_args()
+
+    config = Config()
+    config.parse_config(args)
+    config.init_logger(logging.DEBUG if args.debug else logging.ERROR, "load-test")
+
+    steps = sorted(int(n) for n in args.accounts.split(",") if n.strip())
+    load_test = LoadTest(
+        config,
+        args.bot,
+        args.db_path,
+        duration=args.duration,
+        warmup=args.warmup,
+        time_scale=args.time_scale,
+        latency=args.latency,
+    )
+    results = load_test.run(steps)
+
+    print(format_report(results, {
+        "bot": args.bot,
+        "pair": config.params.get("pair"),
+        "step duration": "{}s".format(args.duration),
+        "time scale": args.time_scale,
+        "latency": "{}s".format(args.latency),
+    }))
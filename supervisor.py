@@ -0,0 +1,32 @@
+import argparse
+import logging
+import os
+import yaml
+
+from dimka.core.config import Config
+from dimka.core.supervisor import Supervisor
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "config",
+        type=str,
+        help="Supervisor config yaml file (full path): /var/www/config/supervisor.yaml",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Show debug info",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.config):
+        parser.error("Config file not found: {}".format(args.config))
+
+    config = Config()
+    with open(args.config, 'r') as stream:
+        config.params = yaml.safe_load(stream)
+
+    log = config.init_logger(logging.DEBUG if args.debug else logging.WARNING, "supervisor")
+
+    Supervisor(config.params, log).run()
@@ -0,0 +1,14 @@
+import argparse
+
+from dimka.core import tracing
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bot cycles traces summary")
+    parser.add_argument(
+        "trace",
+        type=str,
+        help="Trace file (trace_path from bot config): /var/www/data/trace.json",
+    )
+    args = parser.parse_args()
+
+    print(tracing.format_summary(tracing.summarize(tracing.read_traces(args.trace))))